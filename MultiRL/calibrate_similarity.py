@@ -0,0 +1,114 @@
+import argparse
+import itertools
+import json
+import os
+import sys
+import numpy as np
+
+# The shared modules live in the main folder.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import from our custom modules
+from feedback_manager import FEEDBACK_FILE, load_feedback
+from hint_index import field_part
+from similarity_utils import (CALIBRATION_FILE, REFERENCE_BACKEND, RETRIEVAL_THRESHOLD, REWARD_BUCKETS,
+                              SimilarityModel, similarity_to_reward)
+
+# The hint-index threshold is only calibrated from at least this many same-field prompt pairs,
+# and from at most MAX_PROMPT_PAIRS of them.
+MIN_PROMPT_PAIRS = 10
+MAX_PROMPT_PAIRS = 20000
+
+def matched_bound(reference_scores: np.ndarray, candidate_scores: np.ndarray, bound: float) -> float:
+    """
+    The candidate score at the quantile of `bound` among the reference scores, so both backends
+    put the same share of pairs below their bound. If no reference score reaches `bound`, the
+    candidate bound goes just above its highest score: the 1.0 quantile is that score itself,
+    which would let the best pair through.
+    """
+    share_below = float(np.mean(reference_scores < bound))
+    if share_below >= 1.0:
+        return float(np.nextafter(np.max(candidate_scores), np.inf))
+    return float(np.quantile(candidate_scores, share_below))
+
+def calibrate_buckets(reference_scores: np.ndarray, candidate_scores: np.ndarray) -> list:
+    """
+    Quantile-matches a candidate backend onto the reference reward buckets.
+    For each reference bound, the candidate bound is the candidate score at the same quantile,
+    so both backends place the same share of the history into every reward bucket.
+    """
+    return [(matched_bound(reference_scores, candidate_scores, lower_bound), reward)
+            for lower_bound, reward in REWARD_BUCKETS]
+
+def same_field_prompt_pairs(prompts: list, max_pairs: int = MAX_PROMPT_PAIRS) -> list:
+    """Pairs of distinct prompts for the same field: the only prompts the hint index compares."""
+    by_field = {}
+    for prompt in dict.fromkeys(p for p in prompts if p):
+        by_field.setdefault(field_part(prompt), []).append(prompt)
+    # Fields without an id or text are never looked up (see hint_index.field_part).
+    by_field.pop(None, None)
+    pairs = itertools.chain.from_iterable(itertools.combinations(group, 2) for group in by_field.values())
+    return list(itertools.islice(pairs, max_pairs))
+
+def main():
+    """Fits per-backend reward buckets against the reference sentence-transformer."""
+    parser = argparse.ArgumentParser(description="Calibrate a similarity backend onto the 1-5 reward buckets.")
+    parser.add_argument('backend', help="Backend to calibrate (see similarity_backends.py).")
+    parser.add_argument('--model-name', default=None, help="Model name or path for the candidate backend.")
+    parser.add_argument('--reference', default=REFERENCE_BACKEND, help="Backend whose buckets are the target.")
+    parser.add_argument('--feedback-file', default=FEEDBACK_FILE, help="Feedback store providing (generated, correct) pairs.")
+    parser.add_argument('--calibration-file', default=CALIBRATION_FILE, help="Where the calibrated buckets are saved.")
+    args = parser.parse_args()
+
+    feedback_data = load_feedback(args.feedback_file)
+    pairs = [
+        (item['generated_response'], item['correct_response']) for item in feedback_data
+        if item.get('generated_response') and item.get('correct_response')
+    ]
+    if not pairs:
+        print(f"No (generated, correct) pairs found in '{args.feedback_file}'. Cannot calibrate.")
+        return
+    generated, correct = [list(column) for column in zip(*pairs)]
+
+    # Calibrate against the raw reference buckets, not any previously saved calibration.
+    reference = SimilarityModel(backend=args.reference, calibration_file=None)
+    candidate = SimilarityModel(args.model_name, backend=args.backend, calibration_file=None)
+    reference_scores = reference.batch_similarity(generated, correct)
+    candidate_scores = candidate.batch_similarity(generated, correct)
+
+    buckets = calibrate_buckets(reference_scores, candidate_scores)
+    reference_rewards = np.array([similarity_to_reward(s) for s in reference_scores])
+    raw_rewards = np.array([similarity_to_reward(s) for s in candidate_scores])
+    calibrated_rewards = np.array([similarity_to_reward(s, buckets) for s in candidate_scores])
+
+    print(f"\nCalibrated '{args.backend}' on {len(pairs)} pairs against '{args.reference}'.")
+    print(f"Score correlation: {np.corrcoef(reference_scores, candidate_scores)[0, 1]:.4f}")
+    print(f"Reward agreement with default buckets:    {np.mean(raw_rewards == reference_rewards):.2%}")
+    print(f"Reward agreement with calibrated buckets: {np.mean(calibrated_rewards == reference_rewards):.2%}")
+    for (default_bound, reward), (bound, _) in zip(REWARD_BUCKETS, buckets):
+        print(f"  reward {reward}: similarity >= {default_bound:.2f} -> {bound:.4f}")
+
+    # The hint-index threshold was tuned on the reference's prompt similarities; match it on same-field prompts.
+    entry = {'reward_buckets': buckets}
+    prompt_pairs = same_field_prompt_pairs([item.get('prompt') for item in feedback_data])
+    if len(prompt_pairs) < MIN_PROMPT_PAIRS:
+        print(f"\nOnly {len(prompt_pairs)} same-field prompt pairs (need {MIN_PROMPT_PAIRS}): the hint index stays "
+              f"off for '{args.backend}' until it is calibrated on more feedback.")
+    else:
+        first, second = [list(column) for column in zip(*prompt_pairs)]
+        threshold = matched_bound(reference.batch_similarity(first, second), candidate.batch_similarity(first, second),
+                                  RETRIEVAL_THRESHOLD)
+        entry['retrieval_threshold'] = threshold
+        print(f"\nHint-index threshold on {len(prompt_pairs)} same-field prompt pairs: {RETRIEVAL_THRESHOLD:.2f} -> {threshold:.4f}")
+
+    calibration = {}
+    if os.path.exists(args.calibration_file):
+        with open(args.calibration_file, 'r') as f:
+            calibration = json.load(f)
+    calibration[args.backend] = entry
+    with open(args.calibration_file, 'w') as f:
+        json.dump(calibration, f, indent=4)
+    print(f"\nSaved the calibration to '{args.calibration_file}'.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The tests here import the shared modules from the main folder.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
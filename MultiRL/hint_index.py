@@ -0,0 +1,101 @@
+import numpy as np
+
+# Prompts (see prompt_generator.py) describe the field itself first, then its nearby context and the question.
+CONTEXT_HEADER = "\nContext from nearby elements: "
+QUESTION_HEADER = "\nQuestion: "
+# The parts of a field's description that tell it apart from the other fields of its app.
+FIELD_DETAILS = ("Its purpose seems to be '", "It currently contains the text '")
+
+def field_part(prompt: str):
+    """
+    The part of a prompt that describes the field itself: its app, purpose (resource-id) and text.
+    None for a field with neither, whose description is the same for every such field of its app.
+    """
+    part = prompt.split(CONTEXT_HEADER, 1)[0].split(QUESTION_HEADER, 1)[0]
+    return part if any(detail in part for detail in FIELD_DETAILS) else None
+
+class HintIndex:
+    """
+    A nearest-neighbor index over the prompts of reviewed feedback.
+    Each row holds the normalized embedding of a prompt, and the matching reviewer
+    'correct_response' is returned for any new prompt that is similar enough.
+    Only prompts for the same field (an identical field_part) are compared: fields on one
+    screen share most of their context, so whole prompts of different fields can score
+    above the threshold. Fields without a resource-id or text cannot be told apart, so
+    they are neither indexed nor looked up.
+    """
+    def __init__(self, encode, threshold=0.97, initial_capacity=1024):
+        """
+        `encode` maps a list of texts to a matrix of L2-normalized embeddings,
+        e.g. SimilarityModel.encode.
+        """
+        self.encode = encode
+        self.threshold = threshold
+        self.embeddings = None
+        self.responses = []
+        self.row_of_prompt = {}
+        # field_part -> rows of the prompts for that field.
+        self.rows_of_field = {}
+        self.initial_capacity = initial_capacity
+
+    def __len__(self):
+        return len(self.responses)
+
+    def _reserve(self, dim, extra_rows):
+        """Grows the embedding matrix geometrically so incremental adds stay cheap."""
+        needed = len(self.responses) + extra_rows
+        if self.embeddings is None:
+            self.embeddings = np.zeros((max(self.initial_capacity, needed), dim), dtype=np.float32)
+        elif needed > self.embeddings.shape[0]:
+            grown = np.zeros((max(needed, 2 * self.embeddings.shape[0]), dim), dtype=np.float32)
+            grown[:len(self.responses)] = self.embeddings[:len(self.responses)]
+            self.embeddings = grown
+
+    def add_many(self, prompts: list, responses: list):
+        """Adds (prompt, response) pairs, encoding only prompts that are not indexed yet."""
+        pending = {}
+        for prompt, response in zip(prompts, responses):
+            if not prompt or not response or field_part(prompt) is None:
+                continue
+            if prompt in self.row_of_prompt:
+                # The latest reviewer answer for an identical prompt wins.
+                self.responses[self.row_of_prompt[prompt]] = response
+            else:
+                pending[prompt] = response
+
+        new_prompts, new_responses = list(pending), list(pending.values())
+        if not new_prompts:
+            return
+        vectors = np.asarray(self.encode(new_prompts), dtype=np.float32)
+        self._reserve(vectors.shape[1], len(new_prompts))
+        start = len(self.responses)
+        self.embeddings[start:start + len(new_prompts)] = vectors
+        for offset, (prompt, response) in enumerate(zip(new_prompts, new_responses)):
+            self.row_of_prompt[prompt] = start + offset
+            self.rows_of_field.setdefault(field_part(prompt), []).append(start + offset)
+            self.responses.append(response)
+
+    def add(self, prompt: str, response: str):
+        """Adds a single reviewed prompt to the index."""
+        self.add_many([prompt], [response])
+
+    def lookup(self, prompt: str):
+        """
+        Returns (response, similarity) for the closest indexed prompt of the same field if it
+        is within the similarity threshold, otherwise None.
+        """
+        field = field_part(prompt)
+        if field is None:
+            return None
+        if prompt in self.row_of_prompt:
+            return self.responses[self.row_of_prompt[prompt]], 1.0
+        rows = self.rows_of_field.get(field)
+        if not rows:
+            return None
+
+        query = np.asarray(self.encode([prompt]), dtype=np.float32)[0]
+        scores = self.embeddings[rows] @ query
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        return self.responses[rows[best]], float(scores[best])
@@ -0,0 +1,74 @@
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+# The shared modules live in the main folder.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Import from our custom modules
+from feedback_manager import FEEDBACK_FILE, load_feedback, save_feedback
+from rewards import REWARD_THRESHOLD
+from similarity_utils import SimilarityModel
+
+def regrade(feedback_data: list, similarity_model: SimilarityModel, chunk_size: int, batch_size: int) -> Counter:
+    """
+    Re-scores every feedback item in place with the current reward buckets.
+    Items are processed in chunks so each encoder call sees a large batch of distinct hints.
+    Returns a histogram of the new rewards.
+    """
+    histogram = Counter()
+    for start in range(0, len(feedback_data), chunk_size):
+        chunk = feedback_data[start:start + chunk_size]
+        generated = [item.get('generated_response') or '' for item in chunk]
+        correct = [item.get('correct_response') or '' for item in chunk]
+
+        for item, (reward, similarity) in zip(chunk, similarity_model.calculate_rewards(generated, correct, batch_size)):
+            item['reward'] = reward
+            item['similarity'] = similarity
+            histogram[reward] += 1
+
+        print(f"Regraded {min(start + chunk_size, len(feedback_data))}/{len(feedback_data)} items...")
+    return histogram
+
+def main():
+    """Re-computes the 'reward' and 'similarity' fields of the whole feedback store."""
+    parser = argparse.ArgumentParser(description="Bulk offline re-grading of the feedback history.")
+    parser.add_argument('--feedback-file', default=FEEDBACK_FILE, help="Feedback store to rewrite in place.")
+    parser.add_argument('--backend', default='sentence-transformer', help="Similarity backend (see similarity_backends.py).")
+    parser.add_argument('--model-name', default=None, help="Model name or path for the backend, if it needs one.")
+    parser.add_argument('--chunk-size', type=int, default=50000, help="Feedback items scored per chunk.")
+    parser.add_argument('--batch-size', type=int, default=512, help="Encoder batch size.")
+    parser.add_argument('--dry-run', action='store_true', help="Report the new histogram without saving.")
+    args = parser.parse_args()
+
+    feedback_data = load_feedback(args.feedback_file)
+    if not feedback_data:
+        print(f"No feedback found in '{args.feedback_file}'. Nothing to regrade.")
+        return
+
+    old_histogram = Counter(item.get('reward') for item in feedback_data)
+    similarity_model = SimilarityModel(args.model_name, backend=args.backend)
+
+    start_time = time.perf_counter()
+    new_histogram = regrade(feedback_data, similarity_model, args.chunk_size, args.batch_size)
+    elapsed = time.perf_counter() - start_time
+    print(f"\nRegraded {len(feedback_data)} items in {elapsed:.1f}s ({len(feedback_data) / elapsed:.0f} items/s).")
+
+    print("\n--- Reward Histogram (old -> new) ---")
+    for reward in range(1, 6):
+        count = new_histogram[reward]
+        bar = '#' * round(50 * count / len(feedback_data))
+        print(f"  {reward}: {old_histogram[reward]:>8} -> {count:>8}  {bar}")
+    trainable = sum(count for reward, count in new_histogram.items() if reward >= REWARD_THRESHOLD)
+    print(f"Items at or above REWARD_THRESHOLD ({REWARD_THRESHOLD}): {trainable}")
+
+    if args.dry_run:
+        print("\nDry run: feedback file left unchanged.")
+        return
+    save_feedback(feedback_data, args.feedback_file)
+    print(f"\nSaved regraded feedback to '{args.feedback_file}'.")
+
+if __name__ == "__main__":
+    main()
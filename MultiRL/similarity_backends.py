@@ -0,0 +1,120 @@
+import re
+import zlib
+import numpy as np
+
+# Each backend turns a list of texts into a matrix of L2-normalized embeddings, one row per text,
+# so cosine similarity is always a plain dot product. Heavy libraries are imported inside the
+# backend that needs them, which lets the lexical backend run on hosts without torch.
+
+class SentenceTransformerBackend:
+    """The default backend: a full-precision sentence-transformer on torch."""
+    name = 'sentence-transformer'
+
+    def __init__(self, model_name='all-MiniLM-L6-v2'):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.model = SentenceTransformer(model_name, device=self.device)
+        print(f"Sentence-transformer model loaded successfully on {self.device}.")
+
+    def encode(self, texts: list, batch_size: int = 256) -> np.ndarray:
+        return self.model.encode(
+            texts, batch_size=batch_size, convert_to_numpy=True,
+            normalize_embeddings=True, show_progress_bar=False
+        )
+
+class QuantizedSentenceTransformerBackend(SentenceTransformerBackend):
+    """The same sentence-transformer with its Linear layers dynamically quantized to int8 (CPU only)."""
+    name = 'quantized'
+
+    def __init__(self, model_name='all-MiniLM-L6-v2'):
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        self.device = "cpu"
+        model = SentenceTransformer(model_name, device=self.device)
+        self.model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        print("Sentence-transformer model loaded and quantized to int8 on cpu.")
+
+class OnnxBackend:
+    """
+    A MiniLM exported to ONNX and run with onnxruntime, without torch.
+    `model_name` must be a directory holding the tokenizer files and 'model.onnx'
+    (e.g. produced by `optimum-cli export onnx --model sentence-transformers/all-MiniLM-L6-v2`).
+    """
+    name = 'onnx'
+
+    def __init__(self, model_name='all-MiniLM-L6-v2-onnx', max_length=128):
+        import os
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+        self.session = onnxruntime.InferenceSession(
+            os.path.join(model_name, 'model.onnx'), providers=['CPUExecutionProvider']
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.max_length = max_length
+        print(f"ONNX similarity model loaded from '{model_name}'.")
+
+    def encode(self, texts: list, batch_size: int = 256) -> np.ndarray:
+        chunks = []
+        for start in range(0, len(texts), batch_size):
+            inputs = self.tokenizer(
+                texts[start:start + batch_size], padding=True, truncation=True,
+                max_length=self.max_length, return_tensors='np'
+            )
+            feeds = {k: v.astype(np.int64) for k, v in inputs.items() if k in self.input_names}
+            token_embeddings = self.session.run(None, feeds)[0]
+
+            # Mean pooling over real tokens, as sentence-transformers does for MiniLM.
+            mask = inputs['attention_mask'][..., None].astype(np.float32)
+            pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+            chunks.append(pooled)
+        return _normalize(np.vstack(chunks)) if chunks else np.zeros((0, 1), dtype=np.float32)
+
+class LexicalBackend:
+    """
+    A pure NumPy scorer over hashed word and character n-gram counts.
+    Needs no model download and runs in a few MB of RAM, at the cost of ignoring synonyms.
+    """
+    name = 'lexical'
+
+    def __init__(self, model_name=None, dim=2048, char_ngram=3):
+        self.dim = dim
+        self.char_ngram = char_ngram
+
+    def _features(self, text: str) -> list:
+        text = text.lower()
+        features = ['w:' + word for word in re.findall(r'\w+', text)]
+        padded = f" {' '.join(text.split())} "
+        features += ['c:' + padded[i:i + self.char_ngram] for i in range(len(padded) - self.char_ngram + 1)]
+        return features
+
+    def encode(self, texts: list, batch_size: int = 256) -> np.ndarray:
+        embeddings = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for feature in self._features(text or ''):
+                # crc32 is stable across runs, unlike Python's salted hash().
+                embeddings[row, zlib.crc32(feature.encode('utf-8')) % self.dim] += 1.0
+        # Sublinear term frequency keeps long prompts from being dominated by repeated n-grams.
+        return _normalize(np.log1p(embeddings))
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    """L2-normalizes each row, leaving all-zero rows at zero."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return (matrix / np.where(norms == 0, 1.0, norms)).astype(np.float32)
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (SentenceTransformerBackend, QuantizedSentenceTransformerBackend, OnnxBackend, LexicalBackend)
+}
+
+def load_backend(name: str, model_name=None):
+    """Instantiates a similarity backend by name."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown similarity backend '{name}'. Choose from: {', '.join(BACKENDS)}")
+    if model_name is None:
+        return BACKENDS[name]()
+    return BACKENDS[name](model_name)
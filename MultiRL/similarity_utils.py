@@ -1,35 +1,110 @@
-from sentence_transformers import SentenceTransformer, util
-import torch
+import json
+import os
+import numpy as np
+
+from similarity_backends import load_backend
+
+# Per-backend reward buckets and hint-index thresholds written by calibrate_similarity.py.
+CALIBRATION_FILE = "similarity_calibration.json"
+# The backend the default buckets and RETRIEVAL_THRESHOLD were tuned on.
+REFERENCE_BACKEND = 'sentence-transformer'
+# Prompt similarity at which the hint index reuses a reviewed hint (see hint_index.py).
+RETRIEVAL_THRESHOLD = 0.97
+
+# Lower similarity bound for each graded reward, checked from the top down.
+# Anything below the last bound gets a reward of 1.
+REWARD_BUCKETS = [
+    (0.95, 5),  # Perfect or near-perfect semantic match
+    (0.8, 4),   # High similarity
+    (0.6, 3),   # Moderate similarity
+    (0.4, 2),   # Low similarity
+]
+
+def similarity_to_reward(similarity: float, buckets: list = REWARD_BUCKETS) -> int:
+    """Maps a similarity score (from ~0 to 1) to the graded reward scale (1 to 5)."""
+    for lower_bound, reward in buckets:
+        if similarity >= lower_bound:
+            return reward
+    return 1  # Irrelevant or incorrect
+
+def _load_calibration(backend_name: str, path: str) -> dict:
+    """The saved calibration of a backend: {'reward_buckets': [...], 'retrieval_threshold': x}, either may be missing."""
+    if not path or not os.path.exists(path):
+        return {}
+    with open(path, 'r') as f:
+        calibration = json.load(f).get(backend_name, {})
+    # Files from before thresholds were calibrated hold only the bucket list.
+    return {'reward_buckets': calibration} if isinstance(calibration, list) else calibration
+
+def load_calibrated_buckets(backend_name: str, path: str = CALIBRATION_FILE) -> list:
+    """Returns the calibrated reward buckets for a backend, or the default buckets if none were saved."""
+    buckets = _load_calibration(backend_name, path).get('reward_buckets')
+    if not buckets:
+        return REWARD_BUCKETS
+    return [(float(lower_bound), int(reward)) for lower_bound, reward in buckets]
+
+def load_calibrated_threshold(backend_name: str, path: str = CALIBRATION_FILE):
+    """
+    Returns the hint-index threshold for a backend: the calibrated one, RETRIEVAL_THRESHOLD for the
+    reference backend, or None (no retrieval) for an uncalibrated backend, whose scores are on another scale.
+    """
+    threshold = _load_calibration(backend_name, path).get('retrieval_threshold')
+    if threshold is not None:
+        return float(threshold)
+    return RETRIEVAL_THRESHOLD if backend_name == REFERENCE_BACKEND else None
 
 class SimilarityModel:
     """
-    A wrapper for a sentence-transformer model to compute semantic similarity
-    and map it to a graded reward.
+    A wrapper around a similarity backend (see similarity_backends.py) to compute
+    semantic similarity and map it to a graded reward.
     """
-    def __init__(self, model_name='all-MiniLM-L6-v2'):
-        """Initializes and loads the sentence-transformer model."""
-        print(f"Loading sentence-transformer model: {model_name}...")
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
+    def __init__(self, model_name=None, backend=REFERENCE_BACKEND, calibration_file=CALIBRATION_FILE):
+        """Initializes and loads the similarity backend and its reward buckets."""
+        print(f"Loading '{backend}' similarity backend{f': {model_name}' if model_name else ''}...")
         try:
-            self.model = SentenceTransformer(model_name, device=self.device)
-            print(f"Sentence-transformer model loaded successfully on {self.device}.")
+            self.backend = load_backend(backend, model_name)
         except Exception as e:
-            print(f"Error loading sentence-transformer model: {e}")
-            print("Please ensure 'sentence-transformers' and 'torch' are installed.")
+            print(f"Error loading similarity backend '{backend}': {e}")
+            print("Please ensure the backend's dependencies are installed (e.g. 'sentence-transformers' and 'torch').")
             raise
+        self.reward_buckets = load_calibrated_buckets(backend, calibration_file)
+        if self.reward_buckets is not REWARD_BUCKETS:
+            print(f"Using calibrated reward buckets for '{backend}': {self.reward_buckets}")
+        self.retrieval_threshold = load_calibrated_threshold(backend, calibration_file)
 
     def _calculate_similarity(self, text1, text2):
         """Calculates the cosine similarity between two text strings."""
         if not text1 or not text2:
             return 0.0
         
-        # Encode the texts into vector embeddings
-        embedding1 = self.model.encode(text1, convert_to_tensor=True)
-        embedding2 = self.model.encode(text2, convert_to_tensor=True)
-        
-        # Compute cosine-similarity score
-        cosine_score = util.pytorch_cos_sim(embedding1, embedding2)
-        return cosine_score.item()
+        # Embeddings are normalized, so the dot product is the cosine similarity.
+        embedding1, embedding2 = self.encode([text1, text2])
+        return float(np.dot(embedding1, embedding2))
+
+    def encode(self, texts: list, batch_size: int = 256) -> np.ndarray:
+        """Encodes a list of texts into L2-normalized embeddings (one row per text)."""
+        return self.backend.encode(texts, batch_size=batch_size)
+
+    def batch_similarity(self, texts1: list, texts2: list, batch_size: int = 256) -> np.ndarray:
+        """
+        Calculates the cosine similarity of each (texts1[i], texts2[i]) pair.
+        Every distinct string is encoded only once, so repeated hints cost nothing extra.
+        """
+        unique_texts = list(dict.fromkeys(t for t in list(texts1) + list(texts2) if t))
+        if not unique_texts:
+            return np.zeros(len(texts1), dtype=np.float32)
+
+        embeddings = self.encode(unique_texts, batch_size=batch_size)
+        row_of = {text: row for row, text in enumerate(unique_texts)}
+
+        # Empty strings point at an all-zero row so their similarity is 0.0, as in _calculate_similarity.
+        embeddings = np.vstack([embeddings, np.zeros((1, embeddings.shape[1]), dtype=embeddings.dtype)])
+        empty_row = len(unique_texts)
+        rows1 = [row_of[t] if t else empty_row for t in texts1]
+        rows2 = [row_of[t] if t else empty_row for t in texts2]
+
+        # Embeddings are normalized, so the row-wise dot product is the cosine similarity.
+        return np.einsum('ij,ij->i', embeddings[rows1], embeddings[rows2])
 
     def calculate_reward(self, generated_hint, correct_hint):
         """
@@ -37,17 +112,9 @@ class SimilarityModel:
         as described in the experimental setup.
         """
         similarity = self._calculate_similarity(generated_hint, correct_hint)
-        
-        # Map the similarity score (from ~0 to 1) to the specified reward scale (1 to 5)
-        if similarity >= 0.95:
-            reward = 5  # Perfect or near-perfect semantic match
-        elif similarity >= 0.8:
-            reward = 4  # High similarity
-        elif similarity >= 0.6:
-            reward = 3  # Moderate similarity
-        elif similarity >= 0.4:
-            reward = 2  # Low similarity
-        else:
-            reward = 1  # Irrelevant or incorrect
-            
-        return reward, similarity
+        return similarity_to_reward(similarity, self.reward_buckets), similarity
+
+    def calculate_rewards(self, generated_hints: list, correct_hints: list, batch_size: int = 256) -> list:
+        """Batched version of calculate_reward. Returns a list of (reward, similarity) tuples."""
+        similarities = self.batch_similarity(generated_hints, correct_hints, batch_size=batch_size)
+        return [(similarity_to_reward(float(s), self.reward_buckets), float(s)) for s in similarities]
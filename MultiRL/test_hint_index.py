@@ -0,0 +1,61 @@
+import zlib
+
+import numpy as np
+
+from hint_index import HintIndex, field_part
+from prompt_generator import use_context_info_generate_prompt
+
+SCREEN = {'height': 2400, 'width': 1080}
+NEARBY = [
+    {'id': 'com.example.shop:id/title', 'text': 'Create your account', 'label': '', 'bounds': '[0,100][1080,200]'},
+    {'id': 'com.example.shop:id/terms', 'text': 'I agree to the terms of service', 'label': '', 'bounds': '[0,1800][1080,1900]'},
+    {'id': 'com.example.shop:id/submit', 'text': 'Sign up', 'label': '', 'bounds': '[0,2000][1080,2100]'},
+]
+
+def field_prompt(resource_id, bounds):
+    """A prompt for one input field of the same sign-up screen, as main.py builds it."""
+    info = {'app_name': 'com.example.shop', 'id': f'com.example.shop:id/{resource_id}' if resource_id else '', 'text': '',
+            'bounds': bounds, 'nearby-components': NEARBY}
+    return use_context_info_generate_prompt(info, SCREEN['height'], SCREEN['width'])
+
+def bag_of_words(texts):
+    """A stand-in for SimilarityModel.encode: L2-normalized hashed word counts."""
+    vectors = np.zeros((len(texts), 4096), dtype=np.float32)
+    for row, text in enumerate(texts):
+        for word in text.lower().split():
+            vectors[row, zlib.crc32(word.encode('utf-8')) % 4096] += 1
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+def test_fields_on_one_screen_do_not_collide():
+    email = field_prompt('email', '[0,400][1080,500]')
+    password = field_prompt('password', '[0,600][1080,700]')
+    # Whole prompts of the two fields are close enough to pass the retrieval threshold on their own.
+    assert float(np.dot(*bag_of_words([email, password]))) >= 0.9
+
+    index = HintIndex(bag_of_words, threshold=0.9)
+    index.add(email, 'you@example.com')
+    assert index.lookup(password) is None
+
+    index.add(password, 'At least 8 characters')
+    assert index.lookup(email)[0] == 'you@example.com'
+    assert index.lookup(password)[0] == 'At least 8 characters'
+
+def test_same_field_with_changed_context_is_reused():
+    email = field_prompt('email', '[0,400][1080,500]')
+    moved = field_prompt('email', '[0,420][1080,520]').replace('Sign up', 'Sign up now')
+    assert field_part(email) == field_part(moved) and email != moved
+
+    index = HintIndex(bag_of_words, threshold=0.9)
+    index.add(email, 'you@example.com')
+    response, similarity = index.lookup(moved)
+    assert response == 'you@example.com' and similarity < 1.0
+
+def test_fields_without_id_or_text_are_not_indexed():
+    first = field_prompt('', '[0,400][1080,500]')
+    second = field_prompt('', '[0,600][1080,700]')
+    assert field_part(first) is None and field_part(second) is None
+
+    index = HintIndex(bag_of_words, threshold=0.9)
+    index.add(first, 'you@example.com')
+    assert len(index) == 0
+    assert index.lookup(first) is None and index.lookup(second) is None
@@ -0,0 +1,258 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# The controller modules are plain scripts; the graded-mode similarity code lives in MultiRL.
+sys.path.insert(0, REPO_ROOT)
+sys.path.append(os.path.join(REPO_ROOT, 'MultiRL'))
+
+from benchmarks.synthetic import (
+    SCREEN_HEIGHT, SCREEN_WIDTH, build_tiny_t5, generate_feedback, generate_hierarchy
+)
+
+RESULTS_DIR = os.path.join(REPO_ROOT, 'benchmarks', 'results')
+# A benchmark is reported as a regression when its median is this much slower than the baseline.
+REGRESSION_TOLERANCE = 1.10
+
+def time_it(func, repeat: int, warmup: int = 1) -> dict:
+    """Runs `func` `warmup + repeat` times and summarizes the timed runs in seconds."""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    samples.sort()
+    return {
+        'repeat': repeat,
+        'mean_s': statistics.fmean(samples),
+        'p50_s': samples[len(samples) // 2],
+        'p95_s': samples[min(len(samples) - 1, int(0.95 * len(samples)))],
+        'min_s': samples[0],
+    }
+
+@contextlib.contextmanager
+def quiet():
+    """Silences the controller's progress prints inside timed code."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+def bench_ui(args, results):
+    """Hierarchy parsing, component extraction, neighbour search and prompt building."""
+    import xmltodict
+    from ui_utils import get_all_components, find_edit_text, choose_from_pos
+    from prompt_generator import use_context_info_generate_prompt, ScreenComponentCache
+
+    page_source = generate_hierarchy(args.components, args.depth, args.edit_texts, seed=args.seed)
+    data_dict = xmltodict.parse(page_source)
+    all_components = get_all_components(data_dict)
+    edit_texts = find_edit_text(data_dict)
+
+    results['xmltodict_parse'] = time_it(lambda: xmltodict.parse(page_source), args.repeat)
+    results['get_all_components'] = time_it(lambda: get_all_components(data_dict), args.repeat)
+    results['find_edit_text'] = time_it(lambda: find_edit_text(data_dict), args.repeat)
+    results['choose_from_pos'] = time_it(
+        lambda: [choose_from_pos(all_components, e.get('@bounds', ''), SCREEN_HEIGHT, SCREEN_WIDTH) for e in edit_texts],
+        args.repeat
+    )
+
+    def build_screen_prompts():
+        # One cache per screen, as in main.py.
+        cache = ScreenComponentCache()
+        for e_component in edit_texts:
+            dict_info = dict(cache.basic_info(e_component))
+            nearby = choose_from_pos(all_components, e_component.get('@bounds', ''), SCREEN_HEIGHT, SCREEN_WIDTH)
+            dict_info['nearby-components'] = [cache.basic_info(e_near) for e_near in nearby]
+            use_context_info_generate_prompt(dict_info, SCREEN_HEIGHT, SCREEN_WIDTH, token_budget=480, cache=cache)
+
+    results['use_context_info_generate_prompt'] = time_it(build_screen_prompts, args.repeat)
+
+def bench_feedback_store(args, results, feedback):
+    from feedback_manager import load_feedback, save_feedback
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'feedback_data.json')
+        results['save_feedback'] = time_it(lambda: save_feedback(feedback, path), args.repeat)
+        results['load_feedback'] = time_it(lambda: load_feedback(path), args.repeat)
+
+def bench_similarity(args, results, feedback):
+    from similarity_utils import SimilarityModel
+
+    with quiet():
+        similarity_model = SimilarityModel(backend=args.similarity_backend, calibration_file=None)
+    pairs = [(item['generated_response'], item['correct_response']) for item in feedback[:args.similarity_pairs]]
+    generated, correct = [list(column) for column in zip(*pairs)]
+
+    results['calculate_reward'] = time_it(
+        lambda: [similarity_model.calculate_reward(g, c) for g, c in pairs], args.repeat
+    )
+    results['calculate_rewards_batched'] = time_it(
+        lambda: similarity_model.calculate_rewards(generated, correct), args.repeat
+    )
+
+def bench_model(args, results, feedback):
+    """Generation and training on a tiny random T5, so no checkpoint is needed."""
+    import torch
+    from rl_agent import DECODING_MODES, RLAgent, generate_hint
+
+    torch.set_num_threads(args.threads)
+    model, tokenizer = build_tiny_t5(
+        [item['prompt'] for item in feedback] + [item['correct_response'] for item in feedback], seed=args.seed
+    )
+    with quiet():
+        rl_agent = RLAgent(model, tokenizer)
+    prompts = [item['prompt'] for item in feedback[:args.generate_prompts]]
+
+    def generate():
+        with quiet():
+            for prompt in prompts:
+                rl_agent.generate_response(prompt)
+
+    def train():
+        with quiet():
+            rl_agent.train()
+
+    torch.manual_seed(args.seed)
+    results['generate_response'] = time_it(generate, args.repeat)
+
+    # Per-hint latency and decoder steps of every decoding mode (the random model rarely emits EOS,
+    # so the token caps dominate).
+    for mode in DECODING_MODES:
+        steps = []
+        stats = time_it(
+            lambda: steps.extend(
+                generate_hint(model, tokenizer, prompt, rl_agent.device, mode=mode)[1] for prompt in prompts
+            ),
+            args.repeat
+        )
+        stats['decode_steps_mean'] = statistics.fmean(steps)
+        results[f'generate_hint_{mode}'] = stats
+    # Everything in the training set counts as positive in both feedback modes.
+    rl_agent.feedback_data = [dict(item, reward=5) for item in feedback[:args.train_items]]
+    results['train'] = time_it(train, max(1, args.repeat // 5))
+
+def bench_startup(args, results, feedback):
+    """Controller import time and checkpoint loading (plain .bin load vs memory-mapped safetensors)."""
+    import torch
+    from transformers import T5Config, T5ForConditionalGeneration
+    from model_loader import load_model
+
+    for name, directory in (('import_main', REPO_ROOT), ('import_multirl_main', os.path.join(REPO_ROOT, 'MultiRL'))):
+        # A fresh interpreter each time, so nothing is already imported.
+        results[name] = time_it(
+            lambda: subprocess.run([sys.executable, '-c', 'import main'], cwd=directory, check=True),
+            max(1, args.repeat // 4)
+        )
+
+    # Loading cost is dominated by fixed overheads for the tiny benchmark model, so use a t5-small-sized one.
+    torch.manual_seed(args.seed)
+    model = T5ForConditionalGeneration(T5Config(
+        vocab_size=32128, d_model=512, d_kv=64, d_ff=2048, num_layers=6, num_decoder_layers=6, num_heads=8
+    ))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        bin_dir, safetensors_dir = os.path.join(tmp_dir, 'bin'), os.path.join(tmp_dir, 'safetensors')
+        model.save_pretrained(bin_dir, safe_serialization=False)
+        model.save_pretrained(safetensors_dir, safe_serialization=True)
+        torch.set_num_threads(args.threads)
+        results['load_model_bin'] = time_it(lambda: T5ForConditionalGeneration.from_pretrained(bin_dir), args.repeat)
+        with quiet():
+            results['load_model_safetensors'] = time_it(lambda: load_model(safetensors_dir), args.repeat)
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+def compare(baseline_path: str, current: dict) -> bool:
+    """Prints per-benchmark median ratios against a baseline run. Returns True if anything regressed."""
+    with open(baseline_path, 'r') as f:
+        baseline = json.load(f)
+    if baseline['config'] != current['config']:
+        print("Warning: the runs used different configurations; ratios may not be meaningful.")
+
+    print(f"\n{'benchmark':<36}{'baseline p50':>14}{'current p50':>14}{'ratio':>8}")
+    regressed = False
+    for name, stats in current['results'].items():
+        if name not in baseline['results']:
+            print(f"{name:<36}{'-':>14}{stats['p50_s'] * 1000:>12.3f}ms{'new':>8}")
+            continue
+        old = baseline['results'][name]['p50_s']
+        ratio = stats['p50_s'] / old if old else float('inf')
+        flag = '  REGRESSION' if ratio > REGRESSION_TOLERANCE else ''
+        regressed = regressed or bool(flag)
+        print(f"{name:<36}{old * 1000:>12.3f}ms{stats['p50_s'] * 1000:>12.3f}ms{ratio:>8.2f}{flag}")
+    return regressed
+
+def main():
+    """Runs the benchmark suite and writes a JSON result file named after the current commit."""
+    parser = argparse.ArgumentParser(description="HintQT5 benchmark suite on synthetic screens and feedback.")
+    parser.add_argument('--components', type=int, default=300, help="Leaf components per synthetic screen.")
+    parser.add_argument('--depth', type=int, default=8, help="Container nesting depth of the synthetic screen.")
+    parser.add_argument('--edit-texts', type=int, default=12, help="Input fields per synthetic screen.")
+    parser.add_argument('--feedback', type=int, default=5000, help="Items in the synthetic feedback corpus.")
+    parser.add_argument('--similarity-backend', default='lexical', help="Backend for the similarity benchmarks.")
+    parser.add_argument('--similarity-pairs', type=int, default=500, help="Pairs scored per similarity run.")
+    parser.add_argument('--generate-prompts', type=int, default=8, help="Prompts generated per generation run.")
+    parser.add_argument('--train-items', type=int, default=32, help="Feedback items per training run.")
+    parser.add_argument('--threads', type=int, default=1, help="torch intra-op threads for the model benchmarks.")
+    parser.add_argument('--repeat', type=int, default=20, help="Timed runs per benchmark.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--skip', nargs='*', default=[],
+                        choices=['ui', 'feedback', 'similarity', 'model', 'startup'],
+                        help="Benchmark groups to skip.")
+    parser.add_argument('--output', default=None, help="Result file (default: benchmarks/results/<commit>.json).")
+    parser.add_argument('--compare', default=None, help="Baseline result file to compare against.")
+    args = parser.parse_args()
+
+    feedback = generate_feedback(args.feedback, seed=args.seed)
+    results = {}
+    groups = [
+        ('ui', lambda: bench_ui(args, results)),
+        ('feedback', lambda: bench_feedback_store(args, results, feedback)),
+        ('similarity', lambda: bench_similarity(args, results, feedback)),
+        ('model', lambda: bench_model(args, results, feedback)),
+        ('startup', lambda: bench_startup(args, results, feedback)),
+    ]
+    for name, run in groups:
+        if name in args.skip:
+            continue
+        print(f"Running '{name}' benchmarks...")
+        run()
+
+    config = {key: value for key, value in vars(args).items() if key not in ('output', 'compare', 'skip')}
+    run_record = {
+        'commit': git_commit(),
+        'timestamp': time.time(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'config': config,
+        'results': results,
+    }
+    for name, stats in results.items():
+        steps = f"   {stats['decode_steps_mean']:.1f} decoder steps" if 'decode_steps_mean' in stats else ''
+        print(f"  {name:<36} p50 {stats['p50_s'] * 1000:10.3f} ms   p95 {stats['p95_s'] * 1000:10.3f} ms{steps}")
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{run_record['commit']}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(run_record, f, indent=4)
+    print(f"\nSaved results to '{output}'.")
+
+    if args.compare and compare(args.compare, run_record):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import random
+from xml.sax.saxutils import quoteattr
+
+# Vocabulary the synthetic screens, prompts and hints are drawn from.
+FIELD_NAMES = [
+    'email', 'password', 'username', 'first_name', 'last_name', 'phone', 'address', 'city',
+    'zip_code', 'country', 'card_number', 'expiry', 'cvv', 'search', 'message', 'birthday',
+]
+LABEL_TEXTS = [
+    'Email', 'Password', 'User name', 'First name', 'Last name', 'Phone number', 'Street address',
+    'City', 'ZIP code', 'Country', 'Card number', 'Expiry date', 'Security code', 'Search',
+    'Your message', 'Date of birth', 'Sign in', 'Create account', 'Forgot password?', 'Continue',
+]
+CONTAINER_CLASSES = ['android.widget.FrameLayout', 'android.widget.LinearLayout', 'android.view.ViewGroup']
+LEAF_CLASSES = ['android.widget.TextView', 'android.widget.Button', 'android.widget.ImageView']
+EDIT_TEXT_CLASSES = ['android.widget.EditText', 'android.widget.AutoCompleteTextView']
+
+SCREEN_HEIGHT = 2400
+SCREEN_WIDTH = 1080
+
+def _attributes(package, index, widget_class, bounds, name=None, text='', content_desc=''):
+    resource_id = f"{package}:id/{name}_{index}" if name else ''
+    return {
+        'index': str(index), 'text': text, 'resource-id': resource_id, 'class': widget_class,
+        'package': package, 'content-desc': content_desc, 'checkable': 'false', 'clickable': 'true',
+        'enabled': 'true', 'focusable': 'true', 'bounds': bounds,
+    }
+
+def _render(node, indent) -> str:
+    attributes = ' '.join(f'{key}={quoteattr(value)}' for key, value in node['attributes'].items())
+    pad = '  ' * indent
+    if not node['children']:
+        return f'{pad}<node {attributes} />'
+    children = '\n'.join(_render(child, indent + 1) for child in node['children'])
+    return f'{pad}<node {attributes}>\n{children}\n{pad}</node>'
+
+def generate_hierarchy(num_components=200, depth=6, num_edit_texts=10, seed=0,
+                       package='com.example.synthetic') -> str:
+    """
+    Generates a uiautomator2-style hierarchy XML with `num_components` leaf widgets,
+    `num_edit_texts` of which are input fields, nested `depth` containers deep.
+    Leaves are laid out in a grid so choose_from_pos finds realistic neighbour sets.
+    """
+    rng = random.Random(seed)
+    num_edit_texts = min(num_edit_texts, num_components)
+    edit_text_slots = set(rng.sample(range(num_components), num_edit_texts))
+
+    columns = 2
+    rows = max(1, (num_components + columns - 1) // columns)
+    row_height = max(8, SCREEN_HEIGHT // rows)
+    column_width = SCREEN_WIDTH // columns
+
+    leaves = []
+    for i in range(num_components):
+        top, left = (i // columns) * row_height, (i % columns) * column_width
+        bounds = f"[{left},{top}][{left + column_width},{top + row_height}]"
+        name = rng.choice(FIELD_NAMES)
+        if i in edit_text_slots:
+            attributes = _attributes(package, i, rng.choice(EDIT_TEXT_CLASSES), bounds, name=name)
+        else:
+            attributes = _attributes(
+                package, i, rng.choice(LEAF_CLASSES), bounds,
+                name=name if rng.random() < 0.6 else None,
+                text=rng.choice(LABEL_TEXTS) if rng.random() < 0.7 else '',
+                content_desc=rng.choice(LABEL_TEXTS) if rng.random() < 0.2 else '',
+            )
+        leaves.append({'attributes': attributes, 'children': []})
+
+    # Wrap groups of leaves in containers, level by level, until `depth` levels exist.
+    level = leaves
+    for d in range(depth):
+        fan_out = max(2, round(len(level) ** (1 / max(1, depth - d))))
+        level = [
+            {
+                'attributes': _attributes(package, i, rng.choice(CONTAINER_CLASSES),
+                                          f"[0,0][{SCREEN_WIDTH},{SCREEN_HEIGHT}]"),
+                'children': level[start:start + fan_out],
+            }
+            for i, start in enumerate(range(0, len(level), fan_out))
+        ]
+    roots = '\n'.join(_render(node, 1) for node in level)
+    return f"<?xml version='1.0' encoding='UTF-8' standalone='yes' ?>\n<hierarchy rotation=\"0\">\n{roots}\n</hierarchy>"
+
+def generate_feedback(num_items=5000, seed=0, graded=True) -> list:
+    """Generates a feedback corpus shaped like the records main.py saves."""
+    rng = random.Random(seed)
+    feedback = []
+    for _ in range(num_items):
+        field = rng.randrange(len(FIELD_NAMES))
+        context = rng.sample(LABEL_TEXTS, 4)
+        prompt = (
+            f"In the 'synthetic' app, there is an input field. Its purpose seems to be "
+            f"'{FIELD_NAMES[field].replace('_', ' ')}'. \nContext from nearby elements: "
+            + " ".join(f"There is a nearby component, and it displays the text '{text}'." for text in context)
+            + "\nQuestion: What is the most appropriate hint text for this input field?"
+        )
+        correct = f"Enter your {LABEL_TEXTS[field].lower()}"
+        generated = correct if rng.random() < 0.5 else f"Enter {rng.choice(LABEL_TEXTS).lower()}"
+        item = {"prompt": prompt, "generated_response": generated, "correct_response": correct}
+        if graded:
+            item["reward"] = rng.randint(1, 5)
+            item["similarity"] = rng.random()
+        else:
+            item["reward"] = 1 if generated == correct else -1
+        feedback.append(item)
+    return feedback
+
+def build_tiny_t5(corpus: list, seed=0):
+    """
+    Builds a tiny, randomly initialized T5 and a word-level tokenizer over `corpus`,
+    so RLAgent can be benchmarked offline without downloading a checkpoint.
+    """
+    import torch
+    from tokenizers import Tokenizer
+    from tokenizers.models import WordLevel
+    from tokenizers.pre_tokenizers import Whitespace
+    from transformers import PreTrainedTokenizerFast, T5Config, T5ForConditionalGeneration
+
+    vocab = {'<pad>': 0, '</s>': 1, '<unk>': 2}
+    for text in corpus:
+        for word in Whitespace().pre_tokenize_str(text):
+            vocab.setdefault(word[0], len(vocab))
+    backend = Tokenizer(WordLevel(vocab, unk_token='<unk>'))
+    backend.pre_tokenizer = Whitespace()
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=backend, pad_token='<pad>', eos_token='</s>', unk_token='<unk>'
+    )
+
+    torch.manual_seed(seed)
+    config = T5Config(
+        vocab_size=len(vocab), d_model=64, d_kv=16, d_ff=128, num_layers=2, num_decoder_layers=2,
+        num_heads=4, pad_token_id=0, eos_token_id=1, decoder_start_token_id=0,
+    )
+    return T5ForConditionalGeneration(config), tokenizer
@@ -1,32 +1,207 @@
-import os
+import json
+import socket
+import struct
+import subprocess
+import threading
+import time
+
+from metrics import METRICS
 
 # --- CONFIGURATION ---
 # IMPORTANT: This must match the package name you define in your buildozer.spec file.
 KIVY_APP_PACKAGE_NAME = "com.mycompany.hintoverlay"
+# Port the overlay app listens on (on the device). It is forwarded to the same port on this computer.
+OVERLAY_PORT = 8765
+# How long to wait for the overlay app to start listening after it has been launched.
+OVERLAY_STARTUP_TIMEOUT = 15
+# How long a screenshot waits for queued display commands (e.g. the previous screen's clear) to be sent.
+SCREENSHOT_FLUSH_TIMEOUT = 2
+
+# --- Framed protocol ---
+# Every message is a 4-byte big-endian length followed by that many bytes of UTF-8 JSON.
+# These helpers must stay in sync with the ones in overlay_service.py.
+def encode_message(message: dict) -> bytes:
+    payload = json.dumps(message).encode('utf-8')
+    return struct.pack('>I', len(payload)) + payload
+
+def _recv_exact(conn, size):
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+def read_message(conn):
+    """Reads one framed message, or returns None when the connection is closed."""
+    header = _recv_exact(conn, 4)
+    if header is None:
+        return None
+    payload = _recv_exact(conn, struct.unpack('>I', header)[0])
+    return None if payload is None else json.loads(payload.decode('utf-8'))
+
+def _valid_bounds(bounds) -> bool:
+    return len(bounds) == 4 and all(isinstance(p, int) for p in bounds)
+
+class OverlayClient:
+    """
+    A persistent connection to the on-device overlay service (see overlay_service.py).
+    The app is launched once, starts the service and closes; hints are then sent as framed
+    messages over an `adb forward`ed socket. The app is only launched to show a hint, never
+    just to remove or clear hints.
+    """
+    def __init__(self, port=OVERLAY_PORT, serial=None, local_port=None):
+        self.port = port
+        self.serial = serial
+        # Each device needs its own port on this computer when several are connected.
+        self.local_port = local_port or port
+        self.sock = None
+
+    def _adb(self, *args):
+        cmd = ['adb'] + (['-s', self.serial] if self.serial else []) + list(args)
+        return subprocess.run(cmd, capture_output=True, text=True, check=True)
+
+    def _try_connect(self) -> bool:
+        """
+        Opens the forwarded socket and pings the app.
+        `adb forward` accepts connections even when nothing listens on the device,
+        so only a reply proves the overlay app is up.
+        """
+        try:
+            sock = socket.create_connection(('127.0.0.1', self.local_port), timeout=2)
+            sock.sendall(encode_message({'op': 'ping'}))
+            if read_message(sock) is None:
+                sock.close()
+                return False
+        except OSError:
+            return False
+        self.sock = sock
+        return True
 
-def show_hint(bounds: list, hint_text: str):
+    def connect(self, launch: bool = True) -> bool:
+        """
+        Forwards the port and, if the overlay service is not running yet and `launch` is set, launches
+        the app once. Returns whether the service is connected.
+        """
+        if self.sock is not None:
+            return True
+        self._adb('forward', f'tcp:{self.local_port}', f'tcp:{self.port}')
+        if self._try_connect():
+            return True
+        if not launch:
+            return False
+
+        print("Overlay service is not running. Launching it...")
+        # Overlay windows need the 'display over other apps' permission; adb may grant it directly.
+        self._adb('shell', 'appops', 'set', KIVY_APP_PACKAGE_NAME, 'SYSTEM_ALERT_WINDOW', 'allow')
+        self._adb('shell', 'am', 'start', '-n', f'{KIVY_APP_PACKAGE_NAME}/org.kivy.android.PythonActivity')
+        deadline = time.time() + OVERLAY_STARTUP_TIMEOUT
+        while time.time() < deadline:
+            if self._try_connect():
+                print("Connected to overlay service.")
+                return True
+            time.sleep(0.5)
+        raise ConnectionError(f"Overlay service did not start listening on port {self.port}.")
+
+    def close(self):
+        if self.sock is not None:
+            self.sock.close()
+            self.sock = None
+
+    def send(self, message: dict, launch: bool = True):
+        """
+        Sends one message and waits for the service's acknowledgement, reconnecting once if needed.
+        Without `launch`, the message is dropped if the service is not running.
+        """
+        for attempt in range(2):
+            try:
+                if not self.connect(launch):
+                    return
+                self.sock.sendall(encode_message(message))
+                if read_message(self.sock) is not None:
+                    return
+            except OSError as e:
+                if attempt == 1:
+                    raise ConnectionError(f"Could not reach overlay app: {e}") from e
+            # The app was restarted or the forward was dropped; start over.
+            self.close()
+        raise ConnectionError("Overlay app closed the connection.")
+
+    def show_hints(self, hints: list, clear: bool = False):
+        """
+        Adds or updates several hints at once. `hints` is a list of (bounds, text) pairs.
+        With `clear`, every other hint is removed in the same round trip.
+        """
+        self.send({'op': 'update', 'hints': [{'bounds': list(b), 'text': t} for b, t in hints], 'clear': clear})
+
+    def remove_hints(self, bounds_list: list):
+        """Removes the hints shown over each of the given bounds."""
+        # Nothing is shown if the service is not running.
+        self.send({'op': 'remove', 'bounds': [list(b) for b in bounds_list]}, launch=False)
+
+    def clear(self):
+        self.send({'op': 'clear'}, launch=False)
+
+class AsyncDisplayTransport:
     """
-    Constructs and executes an ADB command to launch the Kivy overlay app on the device.
+    Sends display commands from a background thread so hint generation never waits on the device.
+    Commands are coalesced while a send is in flight: only the latest text per bounds is sent,
+    and a clear discards any hints queued before it. Each batch costs one round trip.
     """
-    if not all(isinstance(p, int) for p in bounds) or len(bounds) != 4:
-        print(f"Error: Invalid bounds provided for hint '{hint_text}'. Got: {bounds}")
-        return
-
-    # Format the hint text for the command line (replace spaces with a placeholder)
-    hint_text_formatted = hint_text.replace(' ', '-')
-    bounds_str = ",".join(map(str, bounds))
-
-    # Construct the adb command
-    # This command starts an activity by its full component name and passes data via 'extras' (-e)
-    cmd = (
-        f"adb shell am start -n {KIVY_APP_PACKAGE_NAME}/org.kivy.android.PythonActivity "
-        f"-e text '{hint_text_formatted}' "
-        f"-e bounds '{bounds_str}'"
-    )
-
-    print(f"Executing display command: {cmd}")
-    try:
-        os.system(cmd)
-    except Exception as e:
-        print(f"Error executing ADB command to display hint: {e}")
+    def __init__(self, client: OverlayClient):
+        self.client = client
+        self._condition = threading.Condition()
+        self._pending_hints = {}
+        self._pending_clear = False
+        self._in_flight = False
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def show_hints(self, hints: list):
+        """Queues (bounds, text) hints; a newer hint for the same bounds replaces a queued one. Does not block."""
+        with self._condition:
+            for bounds, text in hints:
+                if not _valid_bounds(bounds):
+                    print(f"Error: Invalid bounds provided for hint '{text}'. Got: {bounds}")
+                    continue
+                self._pending_hints[tuple(bounds)] = text
+            self._condition.notify()
+
+    def clear(self):
+        """Queues removal of every hint, dropping hints that were queued but not sent yet."""
+        with self._condition:
+            self._pending_hints.clear()
+            self._pending_clear = True
+            self._condition.notify()
+
+    def flush(self, timeout=None) -> bool:
+        """Blocks until every queued command has been sent. Returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not (self._pending_hints or self._pending_clear or self._in_flight), timeout
+            )
 
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending_hints or self._pending_clear)
+                hints, clear = list(self._pending_hints.items()), self._pending_clear
+                self._pending_hints, self._pending_clear = {}, False
+                self._in_flight = True
+            try:
+                # Timed here: show_hints() itself only queues.
+                with METRICS.span('show_hint'):
+                    if hints:
+                        self.client.show_hints(hints, clear=clear)
+                    else:
+                        self.client.clear()
+            except Exception as e:
+                # Any error (a garbled reply, adb failing, ...) drops this batch but must not end the
+                # thread, or later hints would queue forever; the next batch reconnects.
+                print(f"Error sending display commands to the overlay app: {e}")
+                METRICS.increment('display_errors')
+                self.client.close()
+            finally:
+                with self._condition:
+                    self._in_flight = False
+                    self._condition.notify_all()
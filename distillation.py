@@ -0,0 +1,201 @@
+import argparse
+import copy
+import json
+import os
+import random
+import re
+import time
+
+import torch
+import torch.nn.functional as F
+
+from feedback_manager import load_feedback
+from rl_agent import DEFAULT_MAX_NEW_TOKENS, FeedbackDataset, generate_hints, make_optimizer
+
+# Loss = DISTILL_ALPHA x cross-entropy on the targets + (1 - DISTILL_ALPHA) x KL divergence to the
+# teacher's token distributions, softened by DISTILL_TEMPERATURE.
+DISTILL_ALPHA = 0.5
+DISTILL_TEMPERATURE = 2.0
+# Shape of a student cut down from the teacher: the decoder runs once per generated token, so it is
+# cut hardest. The encoder keeps half of the teacher's layers unless set.
+STUDENT_DECODER_LAYERS = 2
+DISTILL_INFO_FILE = 'distillation.json'
+
+def _spread(count: int, total: int) -> list:
+    """`count` evenly spaced layer indices out of `total`, always including the first and last."""
+    if count == 1:
+        return [0]
+    return [round(i * (total - 1) / (count - 1)) for i in range(count)]
+
+def make_student(teacher, num_layers=None, num_decoder_layers=STUDENT_DECODER_LAYERS):
+    """
+    A shallower copy of the teacher: the same embeddings and vocabulary, and an evenly spaced
+    subset of its encoder and decoder layers, so distillation starts from the teacher's weights.
+    """
+    from transformers import T5ForConditionalGeneration
+
+    config = copy.deepcopy(teacher.config)
+    config.num_layers = num_layers or max(1, teacher.config.num_layers // 2)
+    config.num_decoder_layers = num_decoder_layers
+    student = T5ForConditionalGeneration(config)
+
+    layer_maps = {
+        'encoder': _spread(config.num_layers, teacher.config.num_layers),
+        'decoder': _spread(config.num_decoder_layers, teacher.config.num_decoder_layers),
+    }
+    teacher_state = teacher.state_dict()
+    block_key = re.compile(r'^(encoder|decoder)\.block\.(\d+)\.(.*)$')
+    state = {}
+    for key in student.state_dict():
+        match = block_key.match(key)
+        source = key
+        if match:
+            stack, index, rest = match.groups()
+            source = f"{stack}.block.{layer_maps[stack][int(index)]}.{rest}"
+        state[key] = teacher_state[source]
+    student.load_state_dict(state)
+    return student
+
+def num_parameters(model) -> int:
+    return sum(p.numel() for p in model.parameters())
+
+def distillation_pairs(teacher, tokenizer, prompts: list, labeled: dict, device, batch_size: int = 32) -> list:
+    """
+    One (prompt, target) pair per prompt: the accepted hint from `labeled` (prompt -> correct_response)
+    where there is one, otherwise the teacher's own greedy hint.
+    """
+    unlabeled = [prompt for prompt in prompts if prompt not in labeled]
+    teacher_hints = {}
+    for start in range(0, len(unlabeled), batch_size):
+        batch = unlabeled[start:start + batch_size]
+        for prompt, (hint, _) in zip(batch, generate_hints(teacher, tokenizer, batch, device, mode='greedy')):
+            teacher_hints[prompt] = hint
+    pairs = [(prompt, labeled.get(prompt, teacher_hints.get(prompt))) for prompt in prompts]
+    return [(prompt, target) for prompt, target in pairs if target]
+
+def history_prompts_and_labels(feedback_data: list, tokenizer, is_trainable=None, max_prompts=None) -> tuple:
+    """
+    The distinct prompts of the feedback history (the newest `max_prompts`, if set) and the
+    accepted hint of each trainable item, as chosen by FeedbackDataset.
+    """
+    kwargs = {'is_trainable': is_trainable} if is_trainable is not None else {}
+    labeled = {item['prompt']: item['correct_response'] for item in FeedbackDataset(feedback_data, tokenizer, **kwargs).feedback_data}
+    prompts = list(dict.fromkeys(item['prompt'] for item in reversed(feedback_data) if item.get('prompt')))
+    return prompts[:max_prompts] if max_prompts else prompts, labeled
+
+def distill(teacher, student, tokenizer, pairs: list, device, epochs: int = 1, batch_size: int = 8, lr: float = 3e-4,
+            alpha: float = DISTILL_ALPHA, temperature: float = DISTILL_TEMPERATURE, max_length: int = 512,
+            low_memory: bool = False, seed: int = 0) -> list:
+    """
+    Trains `student` on (prompt, target) pairs to match both the targets and the teacher's token
+    distributions (the teacher is only run forward). Returns the mean loss of every epoch.
+    """
+    if not pairs:
+        return []
+    teacher.eval()
+    student.train()
+    optimizer = make_optimizer(student.parameters(), lr, low_memory)
+    rng = random.Random(seed)
+    history = []
+    for epoch in range(1, epochs + 1):
+        order = list(pairs)
+        rng.shuffle(order)
+        total_loss, batches = 0.0, 0
+        for start in range(0, len(order), batch_size):
+            prompts, targets = zip(*order[start:start + batch_size])
+            inputs = tokenizer(list(prompts), max_length=max_length, truncation=True, padding=True, return_tensors='pt')
+            labels = tokenizer(list(targets), max_length=DEFAULT_MAX_NEW_TOKENS, truncation=True, padding=True,
+                               return_tensors='pt')['input_ids']
+            labels[labels == tokenizer.pad_token_id] = -100
+            batch = {'input_ids': inputs['input_ids'].to(device), 'attention_mask': inputs['attention_mask'].to(device),
+                     'labels': labels.to(device)}
+
+            with torch.no_grad():
+                teacher_logits = teacher(**batch).logits
+            outputs = student(**batch)
+            mask = batch['labels'] != -100
+            kl = F.kl_div(
+                F.log_softmax(outputs.logits / temperature, dim=-1), F.softmax(teacher_logits / temperature, dim=-1),
+                reduction='none'
+            ).sum(dim=-1)[mask].mean() * temperature ** 2
+            loss = alpha * outputs.loss + (1 - alpha) * kl
+
+            optimizer.zero_grad()
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item()
+            batches += 1
+        history.append({'epoch': epoch, 'loss': total_loss / batches})
+        print(f"Distillation epoch {epoch}/{epochs}: loss {total_loss / batches:.4f}")
+    student.zero_grad(set_to_none=True)
+    student.eval()
+    return history
+
+def main():
+    """Distils a fine-tuned teacher checkpoint into a smaller student on the feedback history."""
+    from train_offline import add_feedback_arguments, resolve_feedback_arguments, split_feedback
+
+    parser = argparse.ArgumentParser(description="Distil the fine-tuned hint model into a smaller student model.")
+    parser.add_argument('--teacher', required=True, help="Fine-tuned teacher checkpoint (e.g. main.py's MODEL_PATH).")
+    parser.add_argument('--output-dir', required=True, help="Where the student checkpoint is written.")
+    parser.add_argument('--student-init', default=None,
+                        help="Start from this checkpoint (e.g. t5-small, or an earlier student) instead of cutting down the teacher.")
+    parser.add_argument('--encoder-layers', type=int, default=None, help="Encoder layers of a cut-down student (default: half).")
+    parser.add_argument('--decoder-layers', type=int, default=STUDENT_DECODER_LAYERS, help="Decoder layers of a cut-down student.")
+    add_feedback_arguments(parser)
+    parser.add_argument('--val-fraction', type=float, default=0.1,
+                        help="Held out (as in train_offline.py and evaluate.py) so the student is evaluated on unseen items.")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=8)
+    parser.add_argument('--lr', type=float, default=3e-4)
+    parser.add_argument('--alpha', type=float, default=DISTILL_ALPHA, help="Weight of the target loss (the rest goes to the teacher KL).")
+    parser.add_argument('--temperature', type=float, default=DISTILL_TEMPERATURE)
+    parser.add_argument('--low-memory', action='store_true', help="Adafactor instead of Adam (see rl_agent.make_optimizer).")
+    parser.add_argument('--threads', type=int, default=None, help="torch intra-op threads.")
+    args = parser.parse_args()
+    resolve_feedback_arguments(args)
+
+    from model_loader import load_model, load_tokenizer
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    torch.manual_seed(args.seed)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+    tokenizer = load_tokenizer(args.teacher)
+    teacher = load_model(args.teacher).to(device)
+    if args.student_init:
+        student = load_model(args.student_init)
+        if student.config.vocab_size != teacher.config.vocab_size:
+            raise SystemExit(f"'{args.student_init}' has a different vocabulary ({student.config.vocab_size} tokens) "
+                             f"than the teacher ({teacher.config.vocab_size}); use a T5 checkpoint with the same tokenizer.")
+    else:
+        student = make_student(teacher, args.encoder_layers, args.decoder_layers)
+    student.to(device)
+    print(f"Teacher: {num_parameters(teacher) / 1e6:.1f}M parameters; student: {num_parameters(student) / 1e6:.1f}M "
+          f"({student.config.num_layers} encoder / {student.config.num_decoder_layers} decoder layers).")
+
+    train_items, _ = split_feedback(load_feedback(args.feedback_file), args.val_fraction, args.seed)
+    prompts, labeled = history_prompts_and_labels(
+        train_items, tokenizer, lambda item: item.get('reward', 0) >= args.min_reward
+    )
+    start_time = time.perf_counter()
+    pairs = distillation_pairs(teacher, tokenizer, prompts, labeled, device)
+    print(f"Built {len(pairs)} distillation pairs ({len(labeled)} accepted hints, the rest from the teacher) "
+          f"in {time.perf_counter() - start_time:.1f}s.")
+    if not pairs:
+        print(f"No prompts to distil on in '{args.feedback_file}'.")
+        return
+
+    history = distill(teacher, student, tokenizer, pairs, device, args.epochs, args.batch_size, args.lr,
+                      args.alpha, args.temperature, low_memory=args.low_memory, seed=args.seed)
+    student.save_pretrained(args.output_dir, safe_serialization=True)
+    tokenizer.save_pretrained(args.output_dir)
+    with open(os.path.join(args.output_dir, DISTILL_INFO_FILE), 'w') as f:
+        json.dump({'args': vars(args), 'pairs': len(pairs), 'labeled': len(labeled), 'history': history}, f, indent=4)
+    print(f"Saved the student to '{args.output_dir}'. Compare it with the teacher using evaluate.py "
+          f"(in the main folder):\n  python evaluate.py --model-path {args.output_dir} --baseline {args.teacher}")
+
+if __name__ == "__main__":
+    main()
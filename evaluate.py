@@ -0,0 +1,238 @@
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import defaultdict
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+# The similarity scoring lives in MultiRL.
+sys.path.append(os.path.join(REPO_ROOT, 'MultiRL'))
+
+from feedback_manager import FEEDBACK_FILE, load_feedback
+
+APP_PATTERN = re.compile(r"In the '([^']*)' app")
+
+def app_of(prompt: str) -> str:
+    """The app name prompt_generator.py puts at the start of every prompt."""
+    match = APP_PATTERN.search(prompt or '')
+    return (match.group(1) or 'unknown') if match else 'unknown'
+
+def normalize(text: str) -> str:
+    return ' '.join((text or '').lower().split())
+
+def load_eval_items(args) -> list:
+    """The held-out slice of the feedback store (the same one train_offline.py validates on)."""
+    if args.token_store:
+        from token_store import TokenStore, split_indices
+        store = TokenStore(args.token_store)
+        indices = store.unique_indices() if args.all else split_indices(store, args.val_fraction, args.seed)[1]
+        items = [
+            {'prompt': store.text('prompt_text', i), 'correct_response': store.text('correct_text', i)}
+            for i in indices[:args.limit]
+        ]
+        return [item for item in items if item['prompt'] and item['correct_response']]
+
+    from train_offline import split_feedback
+
+    feedback_data = load_feedback(args.feedback_file)
+    if args.all:
+        items = list({json.dumps(item, sort_keys=True): item for item in feedback_data}.values())
+    else:
+        _, items = split_feedback(feedback_data, args.val_fraction, args.seed)
+    items = [item for item in items if item.get('prompt') and item.get('correct_response')]
+    return items[:args.limit] if args.limit else items
+
+def serving_profile(model, tokenizer, prompts: list, device, args) -> dict:
+    """
+    The model's size, and its latency for one hint at a time, as the controller generates them
+    (in its decoding mode, --serving-decoding, which may differ from the one being scored).
+    """
+    from rl_agent import generate_hint
+
+    latencies = []
+    for prompt in prompts[:args.latency_samples]:
+        start_time = time.perf_counter()
+        generate_hint(model, tokenizer, prompt, device, args.max_new_tokens, args.serving_decoding)
+        latencies.append(time.perf_counter() - start_time)
+    latencies.sort()
+    return {
+        'num_parameters': sum(p.numel() for p in model.parameters()),
+        'model_mb': sum(p.numel() * p.element_size() for p in model.parameters()) / 2 ** 20,
+        'latency_ms_p50': 1000 * latencies[len(latencies) // 2] if latencies else 0.0,
+        'serving_decoding': args.serving_decoding,
+    }
+
+def generate_all(model_path: str, prompts: list, args) -> tuple:
+    """
+    Generates hints for every prompt in padded batches. Prompts are sorted by length first,
+    so each batch holds prompts of similar length and little time is spent on padding.
+    Returns the hints and decoder steps in prompt order, the generation time in seconds and
+    the model's serving profile.
+    """
+    import torch
+    from model_loader import load_model, load_tokenizer
+    from rl_agent import generate_hints
+
+    tokenizer = load_tokenizer(model_path)
+    model = load_model(model_path)
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model.to(device)
+    torch.manual_seed(args.seed)
+
+    order = sorted(range(len(prompts)), key=lambda i: len(prompts[i]))
+    hints, steps = [None] * len(prompts), [0] * len(prompts)
+    start_time = time.perf_counter()
+    for start in range(0, len(order), args.batch_size):
+        batch = order[start:start + args.batch_size]
+        outputs = generate_hints(
+            model, tokenizer, [prompts[i] for i in batch], device, args.max_new_tokens, args.decoding
+        )
+        for i, (hint, num_steps) in zip(batch, outputs):
+            hints[i], steps[i] = hint, num_steps
+        print(f"  Generated {min(start + args.batch_size, len(order))}/{len(order)} hints...")
+    generation_seconds = time.perf_counter() - start_time
+    return hints, steps, generation_seconds, serving_profile(model, tokenizer, prompts, device, args)
+
+def summarize(rows: list) -> dict:
+    count = len(rows)
+    return {
+        'count': count,
+        'exact_match': sum(row['exact_match'] for row in rows) / count,
+        'mean_similarity': sum(row['similarity'] for row in rows) / count,
+        'mean_reward': sum(row['reward'] for row in rows) / count,
+        'decode_steps_mean': sum(row['decode_steps'] for row in rows) / count,
+    }
+
+def evaluate_checkpoint(model_path: str, items: list, similarity_model, args) -> dict:
+    """Generates and scores a hint for every held-out item. Returns overall and per-app metrics."""
+    from similarity_utils import similarity_to_reward
+
+    print(f"\nEvaluating '{model_path}' on {len(items)} items...")
+    prompts = [item['prompt'] for item in items]
+    references = [item['correct_response'] for item in items]
+    hints, steps, generation_seconds, profile = generate_all(model_path, prompts, args)
+
+    start_time = time.perf_counter()
+    similarities = similarity_model.batch_similarity(hints, references, batch_size=args.similarity_batch_size)
+    scoring_seconds = time.perf_counter() - start_time
+
+    rows = []
+    for prompt, hint, reference, similarity, num_steps in zip(prompts, hints, references, similarities, steps):
+        rows.append({
+            'app': app_of(prompt), 'exact_match': normalize(hint) == normalize(reference),
+            'similarity': float(similarity), 'reward': similarity_to_reward(float(similarity), similarity_model.reward_buckets),
+            'decode_steps': num_steps,
+        })
+    by_app = defaultdict(list)
+    for row in rows:
+        by_app[row['app']].append(row)
+
+    return {
+        'model_path': model_path,
+        'overall': {
+            **summarize(rows),
+            'generation_seconds': generation_seconds,
+            'scoring_seconds': scoring_seconds,
+            'hints_per_second': len(rows) / generation_seconds if generation_seconds else 0.0,
+            **profile,
+        },
+        'per_app': {app: summarize(app_rows) for app, app_rows in sorted(by_app.items())},
+        'samples': [
+            {'prompt': prompt, 'generated_response': hint, 'correct_response': reference}
+            for prompt, hint, reference in list(zip(prompts, hints, references))[:args.samples]
+        ],
+    }
+
+def print_report(result: dict, baseline: dict = None):
+    """Prints overall and per-app metrics, with the change from `baseline` when given."""
+    def line(name, stats, base_stats):
+        delta = ''
+        if base_stats:
+            delta = (f"  ({stats['exact_match'] - base_stats['exact_match']:+.3f} / "
+                     f"{stats['mean_similarity'] - base_stats['mean_similarity']:+.3f} / "
+                     f"{stats['mean_reward'] - base_stats['mean_reward']:+.2f})")
+        print(f"  {name:<28}{stats['count']:>7}{stats['exact_match']:>9.3f}{stats['mean_similarity']:>9.3f}"
+              f"{stats['mean_reward']:>8.2f}{delta}")
+
+    overall = result['overall']
+    print(f"\n--- {result['model_path']} ---")
+    print(f"Generated {overall['count']} hints in {overall['generation_seconds']:.1f}s "
+          f"({overall['hints_per_second']:.1f} hints/s, {overall['decode_steps_mean']:.1f} decoder steps per hint); "
+          f"scored in {overall['scoring_seconds']:.1f}s.")
+    size = (f"Model: {overall['num_parameters'] / 1e6:.1f}M parameters ({overall['model_mb']:.0f} MB), "
+            f"{overall['latency_ms_p50']:.0f} ms per hint (p50, one at a time, '{overall['serving_decoding']}' decoding)")
+    base = baseline and baseline['overall']
+    if base and overall['model_mb'] and overall['latency_ms_p50']:
+        size += (f"; {base['model_mb'] / overall['model_mb']:.1f}x smaller and "
+                 f"{base['latency_ms_p50'] / overall['latency_ms_p50']:.1f}x faster than the baseline")
+    print(size + ".")
+    print(f"  {'app':<28}{'items':>7}{'exact':>9}{'sim':>9}{'reward':>8}" + ("  (change vs baseline)" if baseline else ''))
+    line('ALL', overall, baseline and baseline['overall'])
+    for app, stats in result['per_app'].items():
+        line(app, stats, baseline and baseline['per_app'].get(app))
+
+def main():
+    """Scores one checkpoint (or two, side by side) on the held-out feedback slice."""
+    parser = argparse.ArgumentParser(description="Batched offline evaluation of hint checkpoints on the feedback history.")
+    parser.add_argument('--model-path', required=True, help="Checkpoint to evaluate.")
+    parser.add_argument('--baseline', default=None, help="Second checkpoint to compare against (e.g. before training).")
+    parser.add_argument('--feedback-file', default=FEEDBACK_FILE)
+    parser.add_argument('--token-store', default=None,
+                        help="Read the items from this token store instead (the split train_offline.py --token-store uses).")
+    parser.add_argument('--val-fraction', type=float, default=0.1, help="Held-out share, as in train_offline.py.")
+    parser.add_argument('--seed', type=int, default=0, help="Split seed, as in train_offline.py.")
+    parser.add_argument('--all', action='store_true', help="Evaluate on the whole feedback store instead.")
+    parser.add_argument('--limit', type=int, default=None, help="Evaluate at most this many items.")
+    parser.add_argument('--decoding', default='greedy', help="Decoding mode (see DECODING_MODES in rl_agent.py).")
+    parser.add_argument('--max-new-tokens', type=int, default=None)
+    parser.add_argument('--batch-size', type=int, default=32, help="Prompts per generate() call.")
+    parser.add_argument('--threads', type=int, default=None, help="torch intra-op threads.")
+    parser.add_argument('--similarity-backend', default='sentence-transformer')
+    parser.add_argument('--calibration', default=None,
+                        help="Similarity calibration file (default: the one runner.py uses, in MultiRL).")
+    parser.add_argument('--similarity-batch-size', type=int, default=256)
+    parser.add_argument('--samples', type=int, default=20, help="Generated hints to keep in the report.")
+    parser.add_argument('--latency-samples', type=int, default=20,
+                        help="Prompts generated one at a time to measure the per-hint latency.")
+    parser.add_argument('--serving-decoding', default='sample',
+                        help="Decoding mode of the latency measurement: DECODING_MODE in runner.py.")
+    parser.add_argument('--output', default='eval_results.json')
+    args = parser.parse_args()
+
+    from similarity_utils import (
+        CALIBRATION_FILE, REFERENCE_BACKEND, REWARD_BUCKETS, SimilarityModel, load_calibrated_buckets
+    )
+    if args.calibration is None:
+        args.calibration = os.path.join(REPO_ROOT, 'MultiRL', CALIBRATION_FILE)
+    # The default buckets only fit the reference backend's scores; rewards of any other backend
+    # would not be comparable with the ones given during collection.
+    if (args.similarity_backend != REFERENCE_BACKEND
+            and load_calibrated_buckets(args.similarity_backend, args.calibration) is REWARD_BUCKETS):
+        parser.error(f"The '{args.similarity_backend}' backend has no reward buckets in '{args.calibration}'. "
+                     f"Run MultiRL/calibrate_similarity.py {args.similarity_backend} first, or pass --calibration.")
+
+    items = load_eval_items(args)
+    if not items:
+        print(f"No feedback to evaluate in '{args.feedback_file}'.")
+        return
+    if args.threads:
+        import torch
+        torch.set_num_threads(args.threads)
+
+    similarity_model = SimilarityModel(backend=args.similarity_backend, calibration_file=args.calibration)
+
+    # Checkpoints are evaluated one after the other, so only one is in memory at a time.
+    results = {'config': vars(args), 'model': evaluate_checkpoint(args.model_path, items, similarity_model, args)}
+    if args.baseline:
+        results['baseline'] = evaluate_checkpoint(args.baseline, items, similarity_model, args)
+        print_report(results['baseline'])
+    print_report(results['model'], results.get('baseline'))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=4)
+    print(f"\nSaved evaluation results to '{args.output}'.")
+
+if __name__ == "__main__":
+    main()
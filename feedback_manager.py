@@ -3,12 +3,12 @@ import os
 
 FEEDBACK_FILE = "feedback_data.json"
 
-def load_feedback() -> list:
+def load_feedback(path: str = FEEDBACK_FILE) -> list:
     """Loads feedback data from the JSON file."""
-    if not os.path.exists(FEEDBACK_FILE):
+    if not os.path.exists(path):
         return []
     try:
-        with open(FEEDBACK_FILE, 'r') as f:
+        with open(path, 'r') as f:
             content = f.read()
             if not content:
                 return []
@@ -16,8 +16,10 @@ def load_feedback() -> list:
     except (json.JSONDecodeError, FileNotFoundError):
         return []
 
-def save_feedback(feedback_list: list):
+def save_feedback(feedback_list: list, path: str = FEEDBACK_FILE):
     """Saves the complete feedback list to the JSON file."""
-    with open(FEEDBACK_FILE, 'w') as f:
+    # Write to a temporary file first so an interrupted save never leaves a truncated history behind.
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w') as f:
         json.dump(feedback_list, f, indent=4)
-
+    os.replace(tmp_path, path)
@@ -0,0 +1,88 @@
+import os
+
+from feedback_manager import FEEDBACK_FILE
+from metrics import METRICS
+from rewards import BINARY_MIN_REWARD, REWARD_THRESHOLD
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+class BinaryFeedback:
+    """The yes/no review of main.py. Accepted hints get reward 1; corrected hints get -1."""
+    name = 'binary'
+    feedback_file = os.path.join(REPO_ROOT, FEEDBACK_FILE)
+    min_reward = BINARY_MIN_REWARD
+
+    def collect(self, generated_hint: str, ask) -> dict:
+        """Asks the reviewer about `generated_hint` through `ask(question) -> answer`."""
+        while True:
+            answer = ask("Is this hint correct? (yes/no): ").strip().lower()
+            if answer in ['yes', 'no']:
+                break
+            print("Invalid input. Please enter 'yes' or 'no'.")
+
+        if answer == 'yes':
+            return {'correct_response': generated_hint, 'reward': 1, 'details': {}, 'show_correction': False}
+        correct_response = ask("Please provide the correct hint: ").strip()
+        return {'correct_response': correct_response, 'reward': -1, 'details': {}, 'show_correction': True}
+
+    def from_answer(self, generated_hint: str, answer: dict):
+        """The feedback for an answer from the review page (see review_queue.py), or None if it was skipped."""
+        if answer['verdict'] == 'yes':
+            return {'correct_response': generated_hint, 'reward': 1, 'details': {}, 'show_correction': False}
+        if answer['verdict'] == 'no':
+            return {'correct_response': answer['correct_response'], 'reward': -1, 'details': {}, 'show_correction': True}
+        return None
+
+    def is_trainable(self, item: dict) -> bool:
+        return item.get('reward', 0) >= self.min_reward
+
+class GradedFeedback:
+    """
+    The graded review of MultiRL/main.py. The reviewer types the ideal hint and the reward (1-5)
+    comes from its semantic similarity to the generated one. `similarity_model` may be set after
+    construction (e.g. once it has loaded in the background), but before the first review.
+    """
+    name = 'graded'
+    feedback_file = os.path.join(REPO_ROOT, 'MultiRL', FEEDBACK_FILE)
+
+    def __init__(self, similarity_model=None, reward_threshold=REWARD_THRESHOLD):
+        self.similarity_model = similarity_model
+        self.min_reward = reward_threshold
+
+    def collect(self, generated_hint: str, ask) -> dict:
+        """Asks the reviewer for the reference hint. Returns None when the reviewer skips the field."""
+        correct_response = ask("Please provide the ideal/reference hint: ").strip()
+        if not correct_response:
+            print("Skipping feedback as no reference hint was provided.")
+            return None
+
+        return self._grade(generated_hint, correct_response)
+
+    def from_answer(self, generated_hint: str, answer: dict):
+        """
+        The feedback for an answer from the review page, or None if it was skipped. Accepting a hint
+        makes it its own reference (the top reward); a typed hint is graded like a terminal answer.
+        """
+        if answer['verdict'] == 'yes':
+            return self._grade(generated_hint, generated_hint)
+        if answer['verdict'] == 'no':
+            return self._grade(generated_hint, answer['correct_response'])
+        return None
+
+    def _grade(self, generated_hint: str, correct_response: str) -> dict:
+        with METRICS.span('calculate_reward'):
+            reward, similarity = self.similarity_model.calculate_reward(generated_hint, correct_response)
+        print(f"\n--- Semantic Similarity: {similarity:.4f} ---")
+        print(f"--- Graded Reward (1-5): {reward} ---")
+        return {
+            'correct_response': correct_response, 'reward': reward,
+            'details': {'similarity': similarity}, 'show_correction': reward < 4,
+        }
+
+    def is_trainable(self, item: dict) -> bool:
+        return item.get('reward', 0) >= self.min_reward
+
+STRATEGIES = {
+    BinaryFeedback.name: BinaryFeedback,
+    GradedFeedback.name: GradedFeedback,
+}
@@ -0,0 +1,219 @@
+import copy
+import itertools
+import os
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+import torch
+import torch.multiprocessing as mp
+
+from rl_agent import generate_hint
+
+# A worker still generating one prompt after TASK_TIMEOUT seconds is considered hung and is restarted.
+TASK_TIMEOUT = 120
+# How often (in seconds) the pool checks that its workers are alive.
+MONITOR_INTERVAL = 1
+
+def _shareable_copy(model):
+    """Returns an eval-mode CPU copy of `model` whose weights live in shared memory."""
+    shared = copy.deepcopy(model).to('cpu').eval()
+    shared.share_memory()
+    return shared
+
+def _worker_loop(worker_id, buffers, index, applied, tokenizer, threads, tasks, results, control, published,
+                 running, running_buffer, started):
+    """Takes prompts from the shared task queue until it receives None."""
+    torch.set_num_threads(threads)
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, prompt, max_new_tokens, mode = task
+        running[worker_id] = task_id
+        started[worker_id] = time.time()
+        # Switch to the newest published weights before generating. `published` counts the messages sent,
+        # so none still in transit is missed. A message carries the index of the weight buffer to use,
+        # and the buffer itself the first time it is used. The buffer is then marked as in use, and checked
+        # again in case a publish finished meanwhile: publish() waits for the workers using the buffer it overwrites.
+        while True:
+            while applied < published.value:
+                index, buffer = control.get()
+                applied += 1
+                if buffer is not None:
+                    buffers[index] = buffer
+            running_buffer[worker_id] = index
+            if applied == published.value:
+                break
+
+        try:
+            results.put((task_id, generate_hint(buffers[index], tokenizer, prompt, 'cpu', max_new_tokens, mode), None))
+        except Exception as e:
+            results.put((task_id, None, f"worker {worker_id}: {e!r}"))
+        running_buffer[worker_id] = -1
+        running[worker_id] = -1
+
+class InferencePool:
+    """
+    A pool of CPU worker processes that generate hints from a shared task queue.
+    The weights are copied once into shared memory, so every worker maps the same pages
+    instead of holding its own copy. Each worker runs with `threads_per_worker` intra-op threads,
+    which lets N workers use N x threads_per_worker cores without oversubscription.
+    After training, publish() copies the new weights into a second shared buffer (allocated on the
+    first publish) and switches the workers over to it, alternating between the two buffers.
+    Workers that die, or spend more than `task_timeout` seconds on one prompt, are restarted and
+    the future of the prompt they were generating fails.
+    """
+    def __init__(self, model, tokenizer, num_workers=None, threads_per_worker=1, task_timeout=TASK_TIMEOUT):
+        self.num_workers = num_workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+        self.tokenizer = tokenizer
+        self.threads_per_worker = threads_per_worker
+        self.task_timeout = task_timeout
+        self.context = mp.get_context('spawn')
+        self.tasks = self.context.Queue()
+        self.results = self.context.Queue()
+        self.controls = [None] * self.num_workers
+        self.published = self.context.Value('i', 0)
+        # Per worker: the task it is generating (-1 when idle), the weight buffer it generates from
+        # (-1 when idle), and when it took the task.
+        self.running = self.context.Array('q', [-1] * self.num_workers)
+        self.running_buffer = self.context.Array('b', [-1] * self.num_workers)
+        self.started = self.context.Array('d', self.num_workers)
+        self.futures = {}
+        self.task_ids = itertools.count()
+        self.lock = threading.Lock()
+        # Held by publish() and while a worker is (re)started, so a new worker sees a consistent set of buffers.
+        self.publish_lock = threading.Lock()
+        # In-process generations (see generate_locally()) per weight buffer.
+        self.local_running = [0, 0]
+        self.local_done = threading.Condition()
+        self.closing = False
+
+        self.buffers = [_shareable_copy(model)]
+        self.active_buffer = 0
+        self.workers = [None] * self.num_workers
+        for i in range(self.num_workers):
+            self._start_worker(i)
+        threading.Thread(target=self._collect_results, daemon=True).start()
+        threading.Thread(target=self._monitor_workers, daemon=True).start()
+        print(f"Inference pool started with {self.num_workers} workers x {threads_per_worker} threads.")
+
+    def _start_worker(self, i):
+        """Starts worker `i` on the newest published weights, with a fresh control queue."""
+        with self.publish_lock:
+            self.controls[i] = self.context.Queue()
+            self.running[i] = -1
+            self.running_buffer[i] = -1
+            self.workers[i] = self.context.Process(
+                target=_worker_loop, daemon=True,
+                args=(i, dict(enumerate(self.buffers)), self.active_buffer, self.published.value, self.tokenizer,
+                      self.threads_per_worker, self.tasks, self.results, self.controls[i], self.published,
+                      self.running, self.running_buffer, self.started)
+            )
+            self.workers[i].start()
+
+    def _monitor_workers(self):
+        """Restarts dead or hung workers and fails the futures of their prompts (runs on a background thread)."""
+        while not self.closing:
+            time.sleep(MONITOR_INTERVAL)
+            for i, worker in enumerate(self.workers):
+                if self.closing:
+                    return
+                task_id = self.running[i]
+                if worker.is_alive():
+                    if task_id == -1 or time.time() - self.started[i] < self.task_timeout:
+                        continue
+                    print(f"Inference worker {i} spent more than {self.task_timeout}s on one prompt; restarting it.")
+                    worker.terminate()
+                    worker.join()
+                else:
+                    print(f"Inference worker {i} exited with code {worker.exitcode}; restarting it.")
+                if task_id != -1:
+                    self._resolve(task_id, None, f"worker {i} stopped while generating")
+                self._start_worker(i)
+
+    def _collect_results(self):
+        """Resolves the futures of finished tasks (runs on a background thread)."""
+        while True:
+            self._resolve(*self.results.get())
+
+    def _resolve(self, task_id, result, error):
+        with self.lock:
+            future = self.futures.pop(task_id, None)
+        if future is None:
+            return  # Already failed by _monitor_workers.
+        try:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(RuntimeError(error))
+        except InvalidStateError:
+            pass  # Cancelled by the caller while queued or running; the result is not needed.
+
+    def submit(self, prompt, max_new_tokens=None, mode='sample') -> Future:
+        """Queues a prompt. The future resolves to (hint, number of generated tokens)."""
+        future = Future()
+        task_id = next(self.task_ids)
+        with self.lock:
+            self.futures[task_id] = future
+        self.tasks.put((task_id, prompt, max_new_tokens, mode))
+        return future
+
+    def generate(self, prompts, max_new_tokens=None, mode='sample') -> list:
+        """Generates hints for many prompts in parallel, returned in prompt order."""
+        futures = [self.submit(prompt, max_new_tokens, mode) for prompt in prompts]
+        return [future.result()[0] for future in futures]
+
+    def generate_locally(self, prompt, max_new_tokens=None, mode='sample'):
+        """
+        Generates a hint in the calling process from the newest published weights, for when the
+        workers cannot deliver one. Returns (hint, number of generated tokens) like a submitted prompt.
+        """
+        with self.local_done:
+            index = self.active_buffer
+            self.local_running[index] += 1
+        try:
+            return generate_hint(self.buffers[index], self.tokenizer, prompt, 'cpu', max_new_tokens, mode)
+        finally:
+            with self.local_done:
+                self.local_running[index] -= 1
+                self.local_done.notify_all()
+
+    def publish(self, model):
+        """
+        Hands freshly trained weights to every worker; each switches before its next prompt. They are
+        copied into the buffer the workers are not using, after waiting for any prompt still being
+        generated from it (since two publishes ago), so every prompt keeps consistent weights.
+        """
+        with self.publish_lock:
+            index = 1 - self.active_buffer
+            if len(self.buffers) < 2:
+                self.buffers.append(_shareable_copy(model))
+                buffer = self.buffers[index]
+            else:
+                # Dead or hung workers are stopped by _monitor_workers, so this wait ends.
+                while any(self.running_buffer[i] == index and worker.is_alive() for i, worker in enumerate(self.workers)):
+                    time.sleep(0.01)
+                with self.local_done:
+                    self.local_done.wait_for(lambda: self.local_running[index] == 0)
+                target = self.buffers[index].state_dict()
+                with torch.no_grad():
+                    for name, tensor in model.state_dict().items():
+                        target[name].copy_(tensor)
+                # The workers already hold this buffer.
+                buffer = None
+            for control in self.controls:
+                control.put((index, buffer))
+            with self.published.get_lock():
+                self.published.value += 1
+            with self.local_done:
+                self.active_buffer = index
+        print("Published updated model weights to the inference pool.")
+
+    def close(self):
+        """Stops the workers once they have finished the queued prompts."""
+        self.closing = True
+        for _ in self.workers:
+            self.tasks.put(None)
+        for worker in self.workers:
+            worker.join()
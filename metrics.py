@@ -0,0 +1,124 @@
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Number of most recent samples kept per stage for the rolling percentiles.
+WINDOW_SIZE = 1024
+QUANTILES = (0.5, 0.95, 0.99)
+
+class Metrics:
+    """
+    Lightweight in-process instrumentation: timed spans with rolling percentiles, counters and gauges.
+    Spans are recorded in seconds; percentiles are computed over the last WINDOW_SIZE samples.
+    """
+    def __init__(self, window_size=WINDOW_SIZE):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(lambda: deque(maxlen=window_size))
+        self._span_counts = defaultdict(int)
+        self._span_totals = defaultdict(float)
+        self._counters = defaultdict(float)
+        self._gauges = {}
+
+    @contextmanager
+    def span(self, stage: str):
+        """Times the enclosed block and records it under `stage`, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe(self, stage: str, seconds: float):
+        with self._lock:
+            self._samples[stage].append(seconds)
+            self._span_counts[stage] += 1
+            self._span_totals[stage] += seconds
+
+    def increment(self, counter: str, amount: float = 1):
+        with self._lock:
+            self._counters[counter] += amount
+
+    def set_gauge(self, gauge: str, value: float):
+        """Records the latest value of a quantity that can go up and down (e.g. memory use)."""
+        with self._lock:
+            self._gauges[gauge] = value
+
+    def snapshot(self) -> dict:
+        """Returns the current percentiles and counters as plain data."""
+        with self._lock:
+            stages = {}
+            for stage, samples in self._samples.items():
+                ordered = sorted(samples)
+                stages[stage] = {
+                    'count': self._span_counts[stage],
+                    'sum_seconds': self._span_totals[stage],
+                    **{f'p{int(q * 100)}': _quantile(ordered, q) for q in QUANTILES}
+                }
+            return {
+                'timestamp': time.time(), 'stages': stages,
+                'counters': dict(self._counters), 'gauges': dict(self._gauges),
+            }
+
+    def export_json(self, path: str):
+        """Writes a snapshot to a JSON file."""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=4)
+        os.replace(tmp_path, path)
+
+    def prometheus_text(self) -> str:
+        """Renders a snapshot in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = [
+            "# HELP hintqt5_stage_seconds Latency of each pipeline stage.",
+            "# TYPE hintqt5_stage_seconds summary",
+        ]
+        for stage, stats in sorted(snapshot['stages'].items()):
+            for q in QUANTILES:
+                lines.append(f'hintqt5_stage_seconds{{stage="{stage}",quantile="{q}"}} {stats[f"p{int(q * 100)}"]:.6f}')
+            lines.append(f'hintqt5_stage_seconds_sum{{stage="{stage}"}} {stats["sum_seconds"]:.6f}')
+            lines.append(f'hintqt5_stage_seconds_count{{stage="{stage}"}} {stats["count"]}')
+        for counter, value in sorted(snapshot['counters'].items()):
+            lines.append(f"# TYPE hintqt5_{counter}_total counter")
+            lines.append(f"hintqt5_{counter}_total {value:g}")
+        for gauge, value in sorted(snapshot['gauges'].items()):
+            lines.append(f"# TYPE hintqt5_{gauge} gauge")
+            lines.append(f"hintqt5_{gauge} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    def start_prometheus_server(self, port: int, host: str = '127.0.0.1'):
+        """Serves /metrics on localhost from a daemon thread."""
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep scrapes out of the terminal.
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Serving metrics at http://{host}:{port}/metrics")
+        return server
+
+def _quantile(ordered: list, q: float) -> float:
+    """Nearest-rank quantile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+# Shared instance used by every module of the controller.
+METRICS = Metrics()
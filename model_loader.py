@@ -0,0 +1,83 @@
+import importlib.util
+import os
+import sys
+import threading
+import time
+from concurrent.futures import Future
+
+from metrics import METRICS
+
+SAFETENSORS_WEIGHTS = 'model.safetensors'
+# Heavy libraries (torch, transformers) are imported inside the functions below, so importing
+# this module is cheap and the imports themselves can run on a background thread.
+
+def has_safetensors(model_path: str) -> bool:
+    return os.path.exists(os.path.join(model_path, SAFETENSORS_WEIGHTS))
+
+def load_tokenizer(model_path: str):
+    from transformers import T5Tokenizer
+    return T5Tokenizer.from_pretrained(model_path)
+
+def load_model(model_path: str):
+    """
+    Loads the T5 checkpoint with low_cpu_mem_usage, which skips the random initialization and the
+    second full copy of the weights. With a model.safetensors file the weights are memory-mapped
+    instead of read into RAM up front.
+    """
+    from transformers import T5ForConditionalGeneration
+
+    use_safetensors = has_safetensors(model_path)
+    if not use_safetensors:
+        print(f"Note: '{model_path}' has no {SAFETENSORS_WEIGHTS}; loading will be slower. "
+              f"Run 'python model_loader.py {model_path}' once to convert it.")
+    # transformers needs accelerate for low_cpu_mem_usage; without it the plain load still works.
+    low_cpu_mem_usage = importlib.util.find_spec('accelerate') is not None
+    if not low_cpu_mem_usage:
+        print("Note: install 'accelerate' to load the model with less memory.")
+    return T5ForConditionalGeneration.from_pretrained(
+        model_path, low_cpu_mem_usage=low_cpu_mem_usage, use_safetensors=use_safetensors or None
+    )
+
+class BackgroundLoader:
+    """
+    Runs slow start-up work (library imports, model loading) on background threads, so the
+    device connection and the first hierarchy dump do not wait for it. Each job is timed as
+    a 'load_<name>' metrics stage.
+    """
+    def __init__(self):
+        self.futures = {}
+
+    def start(self, name: str, func, *args):
+        """Starts func(*args) on a new daemon thread. Its result is available from result(name)."""
+        future = Future()
+
+        def run():
+            try:
+                with METRICS.span(f'load_{name}'):
+                    future.set_result(func(*args))
+            except Exception as e:
+                future.set_exception(e)
+
+        self.futures[name] = future
+        threading.Thread(target=run, name=f'load-{name}', daemon=True).start()
+
+    def result(self, name: str):
+        """Blocks until the job is done and returns its result (re-raising its error, if any)."""
+        future = self.futures[name]
+        if not future.done():
+            print(f"Waiting for {name} to finish loading...")
+        return future.result()
+
+def convert_to_safetensors(model_path: str):
+    """Rewrites a pytorch_model.bin checkpoint in place as model.safetensors."""
+    model = load_model(model_path)
+    model.save_pretrained(model_path, safe_serialization=True)
+    print(f"Saved '{os.path.join(model_path, SAFETENSORS_WEIGHTS)}'.")
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python model_loader.py /path/to/fine-tuned-model-T5")
+        sys.exit(1)
+    start_time = time.perf_counter()
+    convert_to_safetensors(sys.argv[1])
+    print(f"Converted in {time.perf_counter() - start_time:.1f}s.")
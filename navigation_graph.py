@@ -0,0 +1,212 @@
+import atexit
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from metrics import METRICS
+
+NAVIGATION_GRAPH_FILE = "navigation_graph.json"
+# Changes are written at most this often (in seconds), and once more at exit.
+SAVE_INTERVAL = 30
+# Field prompts remembered per screen: the speculative prefetch replays them when the screen is predicted.
+MAX_PROMPTS_PER_SCREEN = 16
+# Only the most likely next screens are prefetched, and only transitions seen at least this often.
+PREDICT_TOP_SCREENS = 2
+MIN_TRANSITION_PROBABILITY = 0.2
+
+def screen_app(all_components: list) -> str:
+    """The package of the app a screen belongs to."""
+    return next((c.get('@package') for c in all_components if c.get('@package')), '')
+
+def screen_fingerprint(all_components: list) -> str:
+    """
+    A fingerprint of a screen's structure: its app and the classes and resource ids of its components.
+    Unlike the hierarchy hash it ignores texts and positions, so typing into a field, a ticking clock or
+    a scrolled list still count as the same screen.
+    """
+    structure = sorted({(c.get('@class', ''), c.get('@resource-id', '')) for c in all_components})
+    return hashlib.md5(json.dumps([screen_app(all_components), structure]).encode('utf-8')).hexdigest()[:16]
+
+class NavigationGraph:
+    """
+    Screens seen on the device (by fingerprint) and how often each led to each other screen,
+    learned as the controller runs and kept in a JSON file across sessions. Each screen also
+    remembers the prompts of its input fields from the last visit, which is what lets hints be
+    generated before the screen appears.
+    """
+    def __init__(self, path=NAVIGATION_GRAPH_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.screens = {}
+        self.transitions = {}
+        self._dirty = False
+        self._last_save = time.monotonic()
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                self.screens, self.transitions = data['screens'], data['transitions']
+            except (json.JSONDecodeError, KeyError) as e:
+                print(f"Ignoring unreadable navigation graph '{path}': {e}")
+        atexit.register(self.save)
+
+    def visit(self, previous, fingerprint: str, app: str, prompts: list):
+        """
+        Records that `fingerprint` followed `previous` (None for the first screen). `prompts` may be only
+        some of the screen's fields (the others were already handled), so they are merged into the
+        remembered ones, newest first. The graph is saved every SAVE_INTERVAL seconds.
+        """
+        with self._lock:
+            screen = self.screens.setdefault(fingerprint, {'app': app, 'visits': 0, 'prompts': []})
+            screen['visits'] += 1
+            if prompts:
+                merged = list(dict.fromkeys(prompts + screen['prompts']))
+                screen['prompts'] = merged[:MAX_PROMPTS_PER_SCREEN]
+            if previous is not None and previous != fingerprint:
+                successors = self.transitions.setdefault(previous, {})
+                successors[fingerprint] = successors.get(fingerprint, 0) + 1
+            self._dirty = True
+            if time.monotonic() - self._last_save >= SAVE_INTERVAL:
+                self._save()
+
+    def predict(self, fingerprint: str, top=PREDICT_TOP_SCREENS, min_probability=MIN_TRANSITION_PROBABILITY) -> list:
+        """The likeliest next screens after `fingerprint`, as (fingerprint, probability), most likely first."""
+        with self._lock:
+            successors = dict(self.transitions.get(fingerprint, {}))
+        total = sum(successors.values())
+        ranked = sorted(((count / total, nxt) for nxt, count in successors.items()), reverse=True)
+        return [(nxt, probability) for probability, nxt in ranked[:top] if probability >= min_probability]
+
+    def predicted_prompts(self, fingerprint: str, budget: int) -> list:
+        """Up to `budget` field prompts of the likely next screens, the likeliest screen's first."""
+        prompts = []
+        for nxt, _ in self.predict(fingerprint):
+            with self._lock:
+                prompts.extend(p for p in self.screens.get(nxt, {}).get('prompts', []) if p not in prompts)
+        return prompts[:budget]
+
+    def save(self):
+        """Writes any unsaved changes (also run at exit)."""
+        with self._lock:
+            if self._dirty:
+                self._save()
+
+    def _save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump({'screens': self.screens, 'transitions': self.transitions}, f)
+        os.replace(tmp_path, self.path)
+        self._dirty = False
+        self._last_save = time.monotonic()
+
+class RequestGate:
+    """
+    Counts the user-facing requests (hints, prefetches, feedback) waiting for or holding the agent
+    lock. Speculative generation only starts while there are none, and is_set() makes it stop
+    between decoding steps (like a cancel event) as soon as one arrives.
+    """
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._requests = 0
+
+    @contextmanager
+    def request(self):
+        """Wraps a user-facing request, around taking the agent lock."""
+        with self._condition:
+            self._requests += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._requests -= 1
+                self._condition.notify_all()
+
+    def is_set(self) -> bool:
+        return self._requests > 0
+
+    def wait_idle(self):
+        with self._condition:
+            self._condition.wait_for(lambda: self._requests == 0)
+
+class _AnyEvent:
+    """Set when any of `events` is; used as the cancel event of a speculative generation."""
+    def __init__(self, *events):
+        self.events = events
+
+    def is_set(self) -> bool:
+        return any(event.is_set() for event in self.events)
+
+class SpeculativePrefetcher:
+    """
+    Generates hints for predicted screens on a background thread (RLAgent.speculate), one prompt
+    at a time under the agent lock; with an inference pool the lock is only held to submit it.
+    schedule() replaces whatever was still waiting, and cancel() drops the waiting prompts and
+    stops the one being generated (or drops its pool task), so a new screen never waits for more
+    than one decoding step of speculative work it does not need. A request of any device (see
+    RequestGate) also stops the generation; the prompt is generated again once the requests are served.
+    """
+    def __init__(self, rl_agent, agent_lock, requests):
+        self.rl_agent = rl_agent
+        self.agent_lock = agent_lock
+        self.requests = requests
+        self._condition = threading.Condition()
+        self._pending = []
+        self._cancel = threading.Event()
+        self._current = None
+        # Prompts speculated since the last cancel().
+        self._speculated = set()
+        threading.Thread(target=self._run, name='speculative-prefetch', daemon=True).start()
+
+    def schedule(self, prompts: list):
+        """Starts pre-generating hints for `prompts` (already limited to the prefetch budget)."""
+        with self._condition:
+            self._cancel.set()
+            self._cancel = threading.Event()
+            self._pending = list(prompts)
+            self._condition.notify()
+        if prompts:
+            METRICS.increment('speculative_scheduled', len(prompts))
+
+    def cancel(self, keep=()):
+        """
+        Stops speculative work because a new screen needs its hints now. A hint being generated for
+        one of `keep` (the new screen's prompts, i.e. the prediction was right) is finished instead.
+        """
+        with self._condition:
+            self._pending = []
+            if self._current not in keep:
+                self._cancel.set()
+            dropped = self._speculated - set(keep)
+            self._speculated = set()
+        # Inference pool generations of the screens that did not come.
+        with self.agent_lock:
+            self.rl_agent.drop_speculative(dropped)
+
+    def _speculate(self, prompt, cancel):
+        while not cancel.is_set():
+            self.requests.wait_idle()
+            with self.agent_lock:
+                # A request may have arrived while this thread waited for the lock.
+                if cancel.is_set() or self.requests.is_set():
+                    continue
+                if self.rl_agent.speculate(prompt, _AnyEvent(cancel, self.requests)) or not self.requests.is_set():
+                    return
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._pending:
+                    self._condition.wait()
+                prompt, cancel = self._pending.pop(0), self._cancel
+                self._current = prompt
+                self._speculated.add(prompt)
+            try:
+                self._speculate(prompt, cancel)
+            except Exception as e:
+                print(f"Speculative prefetch failed: {e}")
+            finally:
+                with self._condition:
+                    self._current = None
@@ -0,0 +1,197 @@
+import os
+import json
+import socket
+import struct
+
+from jnius import autoclass, PythonJavaClass, java_method
+
+# --- CONFIGURATION ---
+# The controller reaches this port through `adb forward`. It must match OVERLAY_PORT in display_utils.py.
+OVERLAY_PORT = 8765
+# Name of the service in buildozer.spec (`services = Hintoverlay:main.py:foreground`). python-for-android
+# generates the service class <package>.Service<Name> from it.
+SERVICE_NAME = 'Hintoverlay'
+
+# --- Framed protocol ---
+# Every message is a 4-byte big-endian length followed by that many bytes of UTF-8 JSON.
+# These helpers must stay in sync with the ones in display_utils.py.
+def encode_message(message: dict) -> bytes:
+    payload = json.dumps(message).encode('utf-8')
+    return struct.pack('>I', len(payload)) + payload
+
+def _recv_exact(conn, size):
+    data = b''
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+def read_message(conn):
+    """Reads one framed message, or returns None when the connection is closed."""
+    header = _recv_exact(conn, 4)
+    if header is None:
+        return None
+    payload = _recv_exact(conn, struct.unpack('>I', header)[0])
+    return None if payload is None else json.loads(payload.decode('utf-8'))
+
+Color = autoclass('android.graphics.Color')
+Context = autoclass('android.content.Context')
+GradientDrawable = autoclass('android.graphics.drawable.GradientDrawable')
+Gravity = autoclass('android.view.Gravity')
+Handler = autoclass('android.os.Handler')
+Looper = autoclass('android.os.Looper')
+PixelFormat = autoclass('android.graphics.PixelFormat')
+TextView = autoclass('android.widget.TextView')
+TypedValue = autoclass('android.util.TypedValue')
+View = autoclass('android.view.View')
+LayoutParams = autoclass('android.view.WindowManager$LayoutParams')
+
+class _Runnable(PythonJavaClass):
+    """Runs a Python callable on an Android thread (views may only be touched from the main thread)."""
+    __javainterfaces__ = ['java/lang/Runnable']
+    __javacontext__ = 'app'
+
+    # Posted runnables must stay referenced from Python until Android has run them.
+    _pending = set()
+
+    def __init__(self, func):
+        super().__init__()
+        self.func = func
+        _Runnable._pending.add(self)
+
+    @java_method('()V')
+    def run(self):
+        try:
+            self.func()
+        finally:
+            _Runnable._pending.discard(self)
+
+class HintOverlayService:
+    """
+    Runs inside an Android service and draws every hint in its own small overlay window
+    (TYPE_APPLICATION_OVERLAY, which needs the SYSTEM_ALERT_WINDOW permission) over its field.
+    The windows can neither be touched nor focused, so taps reach the app below, which stays
+    the active window that uiautomator dumps. Hints are driven from the controller over a socket.
+
+    Supported messages:
+      {"op": "update", "hints": [{"bounds": [x1, y1, x2, y2], "text": "..."}, ...], "clear": false}
+      {"op": "remove", "bounds": [[x1, y1, x2, y2], ...]}
+      {"op": "clear"}
+      {"op": "ping"}
+    """
+    def __init__(self, service):
+        self.service = service
+        self.window_manager = service.getSystemService(Context.WINDOW_SERVICE)
+        self.handler = Handler(Looper.getMainLooper())
+        # One text view (and window) per target field, keyed by its bounds.
+        self.views = {}
+
+    def serve(self):
+        """Accepts controller connections and forwards their messages to the main thread."""
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        server.bind(('127.0.0.1', OVERLAY_PORT))
+        server.listen(1)
+        print(f"HintOverlay: Listening for hints on port {OVERLAY_PORT}.")
+
+        while True:
+            conn, _ = server.accept()
+            try:
+                with conn:
+                    while True:
+                        message = read_message(conn)
+                        if message is None:
+                            break
+                        self.handler.post(_Runnable(lambda m=message: self.handle_message(m)))
+                        conn.sendall(encode_message({'ok': True}))
+            except (OSError, ValueError) as e:
+                print(f"HintOverlay: Connection error: {e}")
+
+    def handle_message(self, message):
+        """Applies one protocol message to the overlay."""
+        op = message.get('op')
+        if op == 'update':
+            # 'clear' lets the controller replace the whole screen's hints in one message.
+            if message.get('clear'):
+                for bounds in list(self.views):
+                    self.remove_hint(bounds)
+            for hint in message.get('hints', []):
+                self.set_hint(hint['bounds'], hint['text'])
+        elif op == 'remove':
+            for bounds in message.get('bounds', []):
+                self.remove_hint(bounds)
+        elif op == 'clear':
+            for bounds in list(self.views):
+                self.remove_hint(bounds)
+        elif op != 'ping':
+            print(f"HintOverlay: Unknown message op '{op}'.")
+
+    def set_hint(self, bounds, hint_text):
+        """Shows `hint_text` over `bounds`, replacing any hint already shown there."""
+        key = tuple(bounds)
+        if key in self.views:
+            self.views[key].setText(hint_text)
+            return
+
+        x1, y1, x2, y2 = bounds
+        view = TextView(self.service)
+        view.setText(hint_text)
+        view.setTextColor(Color.WHITE)
+        view.setTextSize(TypedValue.COMPLEX_UNIT_SP, 18)
+        view.setShadowLayer(2, 0, 0, Color.BLACK)
+        view.setGravity(Gravity.CENTER)
+        view.setPadding(10, 10, 10, 10)
+        # Semi-transparent rounded background for readability.
+        background = GradientDrawable()
+        background.setColor(Color.argb(217, 26, 26, 26))
+        background.setCornerRadius(10)
+        view.setBackground(background)
+        # Keep the hint out of the accessibility tree, so uiautomator dumps stay the app's own.
+        view.setImportantForAccessibility(View.IMPORTANT_FOR_ACCESSIBILITY_NO_HIDE_DESCENDANTS)
+
+        # Field bounds are in screen coordinates, as is a window laid out in screen with a top-left gravity.
+        params = LayoutParams(
+            x2 - x1, y2 - y1, x1, y1, LayoutParams.TYPE_APPLICATION_OVERLAY,
+            LayoutParams.FLAG_NOT_TOUCHABLE | LayoutParams.FLAG_NOT_FOCUSABLE
+            | LayoutParams.FLAG_LAYOUT_IN_SCREEN | LayoutParams.FLAG_LAYOUT_NO_LIMITS,
+            PixelFormat.TRANSLUCENT
+        )
+        params.gravity = Gravity.TOP | Gravity.LEFT
+        self.window_manager.addView(view, params)
+        self.views[key] = view
+        print(f"HintOverlay: Showing text='{hint_text}', bounds={bounds}")
+
+    def remove_hint(self, bounds):
+        """Removes the hint shown over `bounds`, if any."""
+        view = self.views.pop(tuple(bounds), None)
+        if view is not None:
+            self.window_manager.removeView(view)
+
+def run_service():
+    """Entry point of the overlay service: serves hints until the service is stopped."""
+    service = autoclass('org.kivy.android.PythonService').mService
+    HintOverlayService(service).serve()
+
+def start_service_and_finish():
+    """
+    Entry point of the app's activity, which is what `adb shell am start` launches: it starts the
+    overlay service and closes straight away, so nothing stays in the foreground.
+    """
+    activity = autoclass('org.kivy.android.PythonActivity').mActivity
+    Settings = autoclass('android.provider.Settings')
+    if not Settings.canDrawOverlays(activity):
+        # display_utils.py grants this with `appops`; without it no overlay window can be added.
+        print("HintOverlay: The SYSTEM_ALERT_WINDOW permission has not been granted.")
+    service = autoclass(f'{activity.getPackageName()}.Service{SERVICE_NAME}')
+    service.start(activity, '')
+    activity.finish()
+
+if __name__ == '__main__':
+    # python-for-android runs this same file as the activity and as the service; only the
+    # service gets a PYTHON_SERVICE_ARGUMENT.
+    if 'PYTHON_SERVICE_ARGUMENT' in os.environ:
+        run_service()
+    else:
+        start_service_and_finish()
@@ -0,0 +1,159 @@
+import cProfile
+import functools
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+PROFILE_MODES = ('cpu', 'torch')
+
+class Profiler:
+    """
+    Opt-in profiling of selected calls, limited to a sampling window.
+
+    - 'cpu' uses cProfile and writes a .pstats file plus flamegraph-ready collapsed stacks.
+    - 'torch' uses torch.profiler and writes a Chrome trace (chrome://tracing, Perfetto) plus
+      collapsed stacks of self CPU time.
+
+    Only the first `window` calls of each profiled name are recorded; later calls run untouched.
+    Only one section records at a time: a section entered while another one runs (e.g. generate_response
+    within a loop iteration, or on another thread) runs untouched and does not use up its window, since
+    nested cProfile profilers switch each other off (3.11) or fail to start (3.12+).
+    With `mode=None` nothing is wrapped, so an idle profiler costs nothing.
+    """
+    def __init__(self, mode=None, output_dir='profiles', window=5):
+        if mode not in (None,) + PROFILE_MODES:
+            raise ValueError(f"Unknown profile mode '{mode}'. Choose from: {', '.join(PROFILE_MODES)}")
+        self.mode = mode
+        self.window = window
+        self.calls = {}
+        self._lock = threading.Lock()
+        # (thread id, cProfile.Profile or None) of the section being recorded.
+        self._active = None
+        self.run_dir = os.path.join(output_dir, time.strftime('%Y%m%d-%H%M%S'))
+        if mode is not None:
+            os.makedirs(self.run_dir, exist_ok=True)
+            print(f"Profiling ({mode}) enabled. Writing profiles to '{self.run_dir}'.")
+
+    def section(self, name: str):
+        """Returns a context manager that profiles the enclosed block while `name` is within its window."""
+        if self.mode is None:
+            return nullcontext()
+        with self._lock:
+            if self._active is not None or self.calls.get(name, 0) >= self.window:
+                return nullcontext()
+            self.calls[name] = self.calls.get(name, 0) + 1
+            self._active = (threading.get_ident(), None)
+        return self._exclusive_section(os.path.join(self.run_dir, f"{name}-{self.calls[name]}"))
+
+    @contextmanager
+    def _exclusive_section(self, path_prefix):
+        try:
+            if self.mode == 'cpu':
+                profile = cProfile.Profile()
+                self._active = (threading.get_ident(), profile)
+                with _cprofile_section(profile, path_prefix):
+                    yield
+            else:
+                with _torch_section(path_prefix):
+                    yield
+        finally:
+            with self._lock:
+                self._active = None
+
+    @contextmanager
+    def paused(self):
+        """
+        Leaves the enclosed block (e.g. waiting for the user) out of a CPU profile this thread is
+        recording. Torch traces only record operators, so waiting shows up there as a gap anyway.
+        """
+        active = self._active
+        if active is None or active[1] is None or active[0] != threading.get_ident():
+            yield
+            return
+        active[1].disable()
+        try:
+            yield
+        finally:
+            active[1].enable()
+
+    def instrument(self, obj, method_name: str):
+        """Replaces obj.method_name on the instance with a profiled wrapper. A no-op when profiling is off."""
+        if self.mode is None:
+            return
+        method = getattr(obj, method_name)
+
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            with self.section(method_name):
+                return method(*args, **kwargs)
+
+        setattr(obj, method_name, wrapper)
+
+@contextmanager
+def _cprofile_section(profile, path_prefix):
+    profile.enable()
+    try:
+        yield
+    finally:
+        profile.disable()
+        profile.dump_stats(path_prefix + '.pstats')
+        write_collapsed_stacks(pstats.Stats(profile), path_prefix + '.stacks.txt')
+        print(f"Saved CPU profile '{path_prefix}.pstats'.")
+
+@contextmanager
+def _torch_section(path_prefix):
+    import torch
+
+    # Recent torch versions only keep the Python frames needed by export_stacks in verbose mode.
+    experimental_config = torch._C._profiler._ExperimentalConfig(verbose=True)
+    with torch.profiler.profile(
+        activities=[torch.profiler.ProfilerActivity.CPU], with_stack=True, experimental_config=experimental_config
+    ) as profile:
+        yield
+    profile.export_chrome_trace(path_prefix + '.trace.json')
+    profile.export_stacks(path_prefix + '.stacks.txt', 'self_cpu_time_total')
+    print(f"Saved torch profile '{path_prefix}.trace.json'.")
+
+def _label(func) -> str:
+    filename, line, name = func
+    label = f"{name} ({os.path.basename(filename)}:{line})" if line else name
+    return label.replace(';', ':')
+
+def write_collapsed_stacks(stats: pstats.Stats, path: str, max_depth=64, min_fraction=1e-4):
+    """
+    Writes 'frame;frame;frame microseconds' lines for flamegraph.pl or speedscope.
+    cProfile only records caller/callee pairs, so time is split across call paths in
+    proportion to each edge's cumulative time; the stacks are an approximation.
+    Paths carrying less than `min_fraction` of the total time are pruned.
+    """
+    entries = stats.stats
+    callees = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, (_, _, _, edge_cumulative) in callers.items():
+            callees.setdefault(caller, []).append((func, edge_cumulative))
+
+    lines = []
+    min_seconds = stats.total_tt * min_fraction
+
+    def visit(func, inclusive, stack):
+        _, _, total, cumulative, _ = entries[func]
+        share = inclusive / cumulative if cumulative else 0.0
+        stack = stack + [_label(func)]
+        self_time = total * share
+        if self_time > 0:
+            lines.append(f"{';'.join(stack)} {max(1, round(self_time * 1e6))}")
+        if len(stack) >= max_depth:
+            return
+        for child, edge_cumulative in callees.get(func, []):
+            child_inclusive = edge_cumulative * share
+            if child in entries and child_inclusive >= min_seconds and _label(child) not in stack:
+                visit(child, child_inclusive, stack)
+
+    for func, (_, _, _, cumulative, callers) in entries.items():
+        if not callers:
+            visit(func, cumulative, [])
+
+    with open(path, 'w') as f:
+        f.write("\n".join(lines) + "\n")
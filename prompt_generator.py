@@ -1,3 +1,8 @@
+import re
+
+from ui_utils import parse_bounds, get_basic_info
+from metrics import METRICS
+
 def turn_null_to_str(prop):
     """Converts None to an empty string, otherwise returns the property."""
     return '' if prop is None else str(prop)
@@ -21,30 +26,137 @@ def format_component_info(component_info: dict) -> str:
         
     return "There is a nearby component, and " + ", and ".join(parts) + "."
 
-def use_context_info_generate_prompt(jsondata: dict, screen_height: int, screen_width: int) -> str:
-    """Constructs the final prompt for the T5 model based on component context."""
+def estimate_token_count(text: str) -> int:
+    """A cheap stand-in for the tokenizer: counts words and punctuation marks."""
+    return len(re.findall(r"\w+|[^\w\s]", text))
+
+def _seen_value(key: str, value) -> tuple:
+    """
+    Normalizes an id, text or label so near-identical repeats compare equal.
+    Ids are only compared with ids; texts and labels are compared with each other.
+    Returns None for empty values.
+    """
+    normalized = ' '.join(turn_null_to_str(value).lower().split())
+    if not normalized:
+        return None
+    if key == 'id':
+        return ('id', normalized.split('/')[-1])
+    return ('text', normalized)
+
+def _center(bounds: list) -> tuple:
+    left, top, right, bottom = bounds
+    return (left + right) / 2, (top + bottom) / 2
+
+def rank_nearby_components(jsondata: dict, screen_height: int, screen_width: int) -> list:
+    """
+    Orders nearby components by how useful they are as context: components that carry
+    a text or label rank above bare resource-ids, and closer components rank above distant ones.
+    """
+    target_bounds = parse_bounds(turn_null_to_str(jsondata.get('bounds')))
+    target_x, target_y = _center(target_bounds)
+    diagonal = max(1.0, (screen_height ** 2 + screen_width ** 2) ** 0.5)
+
+    scored = []
+    for order, component in enumerate(jsondata.get('nearby-components', [])):
+        informativeness = 0.5 * bool(component.get('id')) + bool(component.get('text')) + bool(component.get('label'))
+        if component.get('bounds') and jsondata.get('bounds'):
+            x, y = _center(parse_bounds(component['bounds']))
+            distance = min(1.0, ((x - target_x) ** 2 + (y - target_y) ** 2) ** 0.5 / diagonal)
+        else:
+            distance = 0.5  # Unknown position: neither favour nor penalise it.
+        # `order` keeps ties in hierarchy order so the prompt is deterministic.
+        scored.append((-informativeness * (1.0 - distance), order, component))
+    return [component for _, _, component in sorted(scored, key=lambda entry: entry[:2])]
+
+def remaining_info_keys(component: dict, seen_values: set) -> tuple:
+    """
+    Returns which of the id, text and label values have not been used in the prompt yet,
+    and marks them as used. The result may be empty.
+    """
+    remaining = []
+    for key in ('id', 'text', 'label'):
+        value = _seen_value(key, component.get(key))
+        if value and value not in seen_values:
+            seen_values.add(value)
+            remaining.append(key)
+    return tuple(remaining)
+
+class ScreenComponentCache:
+    """
+    Per-screen cache of component info and description sentences.
+    Fields on one form share almost all of their neighbours, so each component's basic info,
+    description and token count is computed once per screen and reused by every field prompt.
+    Create a new cache whenever the screen changes.
+    """
+    def __init__(self, count_tokens=estimate_token_count):
+        self.count_tokens = count_tokens
+        # Keyed by id(); the component itself is kept alive alongside so the id cannot be reused.
+        self._basic_info = {}
+        self._descriptions = {}
+
+    def basic_info(self, component: dict) -> dict:
+        """Returns get_basic_info(component), computing it only once per screen."""
+        key = id(component)
+        if key not in self._basic_info:
+            self._basic_info[key] = (component, get_basic_info(component))
+        return self._basic_info[key][1]
+
+    def describe(self, component_info: dict, keys: tuple) -> tuple:
+        """Returns the description sentence built from `keys` of the info, and its token count."""
+        cache_key = (id(component_info), keys)
+        if cache_key in self._descriptions:
+            METRICS.increment('screen_cache_hits')
+        else:
+            METRICS.increment('screen_cache_misses')
+            sentence = format_component_info({key: component_info[key] for key in keys})
+            self._descriptions[cache_key] = (component_info, sentence, self.count_tokens(sentence) if sentence else 0)
+        return self._descriptions[cache_key][1:]
+
+def use_context_info_generate_prompt(jsondata: dict, screen_height: int, screen_width: int,
+                                     token_budget: int = None, count_tokens=estimate_token_count,
+                                     cache: ScreenComponentCache = None) -> str:
+    """
+    Constructs the final prompt for the T5 model based on component context.
+    Nearby components are ranked, de-duplicated and added until `token_budget` tokens
+    (as measured by `count_tokens`) would be exceeded. A budget of None keeps every component.
+    Pass the screen's ScreenComponentCache to reuse descriptions across fields.
+    """
+    if cache is None:
+        cache = ScreenComponentCache(count_tokens)
     
     # --- Basic Info ---
     app_name = turn_null_to_str(jsondata.get('app_name')).split('.')[-1]
     prompt = f"In the '{app_name}' app, there is an input field. "
 
+    # The field's own id and text never need repeating in the context.
+    seen_values = set()
     if jsondata.get('id'):
         purpose = jsondata['id'].split('/')[-1].replace('_', ' ')
         prompt += f"Its purpose seems to be '{purpose}'. "
+        seen_values.add(_seen_value('id', jsondata['id']))
     if jsondata.get('text'):
         prompt += f"It currently contains the text '{jsondata['text']}'. "
+        seen_values.add(_seen_value('text', jsondata['text']))
+
+    question = "\nQuestion: What is the most appropriate hint text for this input field?"
+    context_header = "\nContext from nearby elements: "
     
     # --- Contextual Info from Nearby Components ---
-    nearby_info = ""
-    if 'nearby-components' in jsondata:
-        for component in jsondata['nearby-components']:
-            info_str = format_component_info(component)
-            if info_str:
-                nearby_info += info_str + " "
+    nearby_sentences = []
+    used_tokens = cache.count_tokens(prompt + context_header + question) if token_budget else 0
+    for component in rank_nearby_components(jsondata, screen_height, screen_width):
+        info_str, sentence_tokens = cache.describe(component, remaining_info_keys(component, seen_values))
+        if not info_str:
+            continue
+        if token_budget:
+            if used_tokens + sentence_tokens > token_budget:
+                break
+            used_tokens += sentence_tokens
+        nearby_sentences.append(info_str)
     
-    if nearby_info:
-        prompt += "\nContext from nearby elements: " + nearby_info.strip()
+    if nearby_sentences:
+        prompt += context_header + " ".join(nearby_sentences)
 
-    prompt += "\nQuestion: What is the most appropriate hint text for this input field?"
+    prompt += question
     return prompt
 
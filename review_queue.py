@@ -0,0 +1,327 @@
+import io
+import json
+import re
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REVIEW_QUEUE_FILE = "review_queue.db"
+# Margin (in pixels) kept around an input field when its screenshot crop is stored.
+CROP_MARGIN = 120
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    prompt TEXT NOT NULL,
+    generated_response TEXT NOT NULL,
+    context TEXT NOT NULL DEFAULT '{}',
+    screenshot BLOB,
+    answer TEXT
+);
+CREATE INDEX IF NOT EXISTS items_status ON items (status, id);
+"""
+
+def crop_screenshot(image, bounds, margin=CROP_MARGIN):
+    """PNG bytes of the part of a PIL screenshot around `bounds` ([x1, y1, x2, y2]), or None."""
+    if image is None or not bounds:
+        return None
+    x1, y1, x2, y2 = bounds
+    box = (max(0, x1 - margin), max(0, y1 - margin), min(image.width, x2 + margin), min(image.height, y2 + margin))
+    buffer = io.BytesIO()
+    image.crop(box).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+class ReviewQueue:
+    """
+    Durable queue of hints waiting for a reviewer, kept in SQLite so nothing is lost on a restart.
+    Items move from 'pending' to 'answered' when a reviewer answers them on the review page,
+    and to 'consumed' once the controller has stored the answer as feedback.
+    Safe to use from several threads; each call opens its own short transaction.
+    """
+    def __init__(self, path=REVIEW_QUEUE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def enqueue(self, prompt: str, generated_response: str, context: dict = None, screenshot: bytes = None):
+        """Adds a hint for review. Returns its id, or None if the same hint is already pending."""
+        with self._lock:
+            duplicate = self._conn.execute(
+                "SELECT 1 FROM items WHERE status = 'pending' AND prompt = ? AND generated_response = ?",
+                (prompt, generated_response)
+            ).fetchone()
+            if duplicate:
+                return None
+            cursor = self._conn.execute(
+                "INSERT INTO items (created, prompt, generated_response, context, screenshot) VALUES (?, ?, ?, ?, ?)",
+                (time.time(), prompt, generated_response, json.dumps(context or {}), screenshot)
+            )
+            return cursor.lastrowid
+
+    def pending(self, limit: int = 200) -> list:
+        """The oldest pending items (without their screenshots)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, created, prompt, generated_response, context, screenshot IS NOT NULL "
+                "FROM items WHERE status = 'pending' ORDER BY id LIMIT ?", (limit,)
+            ).fetchall()
+        return [
+            {'id': row[0], 'created': row[1], 'prompt': row[2], 'generated_response': row[3],
+             'context': json.loads(row[4]), 'has_screenshot': bool(row[5])}
+            for row in rows
+        ]
+
+    def screenshot(self, item_id: int):
+        with self._lock:
+            row = self._conn.execute("SELECT screenshot FROM items WHERE id = ?", (item_id,)).fetchone()
+        return row[0] if row else None
+
+    def answer(self, item_id: int, answer: dict) -> bool:
+        """
+        Records a reviewer's answer: {'verdict': 'yes'}, {'verdict': 'no', 'correct_response': ...}
+        or {'verdict': 'skip'}. Returns False if the item is not pending any more.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE items SET status = 'answered', answer = ? WHERE id = ? AND status = 'pending'",
+                (json.dumps(answer), item_id)
+            )
+            return cursor.rowcount == 1
+
+    def answered(self) -> list:
+        """
+        The answered items that have not been consumed yet. They stay answered until mark_consumed(),
+        so an answer that could not be stored is handed out again.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, prompt, generated_response, context, answer FROM items "
+                "WHERE status = 'answered' ORDER BY id"
+            ).fetchall()
+        return [
+            {'id': row[0], 'prompt': row[1], 'generated_response': row[2],
+             'context': json.loads(row[3]), 'answer': json.loads(row[4])}
+            for row in rows
+        ]
+
+    def mark_consumed(self, item_id: int):
+        """Marks an answered item as stored as feedback."""
+        with self._lock:
+            self._conn.execute("UPDATE items SET status = 'consumed' WHERE id = ? AND status = 'answered'", (item_id,))
+
+    def counts(self) -> dict:
+        with self._lock:
+            return dict(self._conn.execute("SELECT status, COUNT(*) FROM items GROUP BY status").fetchall())
+
+class ReviewWorker:
+    """
+    Background thread that hands answered items to `on_answer(item)` every `interval` seconds,
+    so reviewer answers reach the feedback store and the training trigger while the controller
+    keeps capturing and generating. An item is only marked consumed once `on_answer` has stored
+    it, so every answer is delivered at least once: one that failed is retried on the next pass,
+    and items answered before a restart are picked up on start. `on_answer` returns False for an
+    item it cannot store in this run, which is then left for a later one.
+    """
+    def __init__(self, queue: ReviewQueue, on_answer, interval: float = 1.0):
+        self.queue = queue
+        self.on_answer = on_answer
+        self.interval = interval
+        self._deferred = set()
+        threading.Thread(target=self._run, daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                for item in self.queue.answered():
+                    if item['id'] in self._deferred:
+                        continue
+                    try:
+                        stored = self.on_answer(item)
+                    except Exception as e:
+                        print(f"Error storing review answer {item['id']}, retrying: {e}")
+                        continue
+                    if stored is False:
+                        self._deferred.add(item['id'])
+                    else:
+                        self.queue.mark_consumed(item['id'])
+            except sqlite3.Error as e:
+                print(f"Error reading the review queue: {e}")
+            time.sleep(self.interval)
+
+# The review page: one card per pending hint, driven from the keyboard.
+REVIEW_PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>Hint review</title>
+<style>
+body { font-family: sans-serif; margin: 0 auto; max-width: 960px; padding: 1em; background: #f4f4f4; }
+.card { display: flex; gap: 1em; background: #fff; border: 2px solid transparent; border-radius: 6px; padding: .8em; margin: .6em 0; }
+.card.selected { border-color: #1a73e8; }
+.card img { max-width: 280px; max-height: 220px; object-fit: contain; }
+.card .body { flex: 1; min-width: 0; }
+.hint { font-size: 1.3em; margin: .3em 0; }
+.meta { color: #666; font-size: .85em; }
+details pre { white-space: pre-wrap; font-size: .8em; }
+input { width: 100%; font-size: 1.1em; padding: .3em; box-sizing: border-box; }
+#help { position: sticky; top: 0; background: #f4f4f4; padding: .4em 0; font-size: .9em; }
+kbd { background: #fff; border: 1px solid #aaa; border-radius: 3px; padding: 0 .3em; }
+</style></head><body>
+<div id="help"><b>Hint review</b> &mdash; <span id="count"></span><br>
+<kbd>j</kbd>/<kbd>k</kbd> move &middot; <kbd>y</kbd> hint is correct &middot; <kbd>n</kbd> type the ideal hint, <kbd>Enter</kbd> to send
+&middot; <kbd>s</kbd> skip &middot; <kbd>Shift</kbd>+<kbd>Y</kbd> accept every hint on the page &middot; <kbd>Esc</kbd> leave the text box</div>
+<div id="items"></div>
+<script>
+let items = [], selected = 0;
+const list = document.getElementById('items');
+
+function render() {
+  list.innerHTML = '';
+  items.forEach((item, i) => {
+    const card = document.createElement('div');
+    card.className = 'card' + (i === selected ? ' selected' : '');
+    if (item.has_screenshot) {
+      const img = document.createElement('img');
+      img.src = '/screenshot/' + item.id;
+      card.appendChild(img);
+    }
+    const body = document.createElement('div');
+    body.className = 'body';
+    const hint = document.createElement('div');
+    hint.className = 'hint';
+    hint.textContent = item.generated_response;
+    const meta = document.createElement('div');
+    meta.className = 'meta';
+    meta.textContent = Object.entries(item.context).map(([k, v]) => k + ': ' + v).join(' \u00b7 ');
+    const details = document.createElement('details');
+    details.innerHTML = '<summary>Prompt</summary><pre></pre>';
+    details.querySelector('pre').textContent = item.prompt;
+    const input = document.createElement('input');
+    input.placeholder = 'Ideal hint (n to type, Enter to send)';
+    input.value = item.draft || '';
+    input.oninput = () => { item.draft = input.value; };
+    input.onfocus = () => { selected = i; markSelected(); };
+    input.onkeydown = (e) => {
+      if (e.key === 'Enter' && input.value.trim()) { answer(i, {verdict: 'no', correct_response: input.value.trim()}); }
+      if (e.key === 'Escape') { input.blur(); }
+      e.stopPropagation();
+    };
+    body.append(hint, meta, details, input);
+    card.appendChild(body);
+    list.appendChild(card);
+  });
+  document.getElementById('count').textContent = items.length + ' pending';
+}
+
+function markSelected() {
+  [...list.children].forEach((card, i) => card.classList.toggle('selected', i === selected));
+  if (list.children[selected]) { list.children[selected].scrollIntoView({block: 'nearest'}); }
+}
+
+function send(answers) {
+  fetch('/api/answers', {method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({answers})});
+}
+
+function answer(i, reply) {
+  const focused = document.activeElement && document.activeElement.tagName === 'INPUT';
+  send([Object.assign({id: items[i].id}, reply)]);
+  items.splice(i, 1);
+  selected = Math.min(selected, Math.max(items.length - 1, 0));
+  render();
+  if (focused && list.children[selected]) { list.children[selected].querySelector('input').focus(); }
+}
+
+document.addEventListener('keydown', (e) => {
+  if (!items.length) { return; }
+  if (e.key === 'j' || e.key === 'ArrowDown') { selected = Math.min(selected + 1, items.length - 1); markSelected(); }
+  else if (e.key === 'k' || e.key === 'ArrowUp') { selected = Math.max(selected - 1, 0); markSelected(); }
+  else if (e.key === 'y') { answer(selected, {verdict: 'yes'}); }
+  else if (e.key === 's') { answer(selected, {verdict: 'skip'}); }
+  else if (e.key === 'Y') { send(items.map((item) => ({id: item.id, verdict: 'yes'}))); items = []; selected = 0; render(); }
+  else if (e.key === 'n' || e.key === 'Enter') { list.children[selected].querySelector('input').focus(); }
+  else { return; }
+  e.preventDefault();
+});
+
+async function refresh() {
+  // Only new items are appended, so the selection and any half-typed hint stay where they are.
+  const response = await fetch('/api/items');
+  const data = await response.json();
+  const known = new Set(items.map((item) => item.id));
+  const fresh = data.items.filter((item) => !known.has(item.id));
+  if (fresh.length) {
+    const focused = document.activeElement && document.activeElement.tagName === 'INPUT';
+    items = items.concat(fresh);
+    render();
+    if (focused && list.children[selected]) { list.children[selected].querySelector('input').focus(); }
+  }
+}
+refresh();
+setInterval(refresh, 2000);
+</script></body></html>
+"""
+
+VERDICTS = ('yes', 'no', 'skip')
+
+def start_review_server(queue: ReviewQueue, port: int, host: str = '127.0.0.1'):
+    """Serves the review page and its small JSON API on localhost from a daemon thread."""
+    screenshot_path = re.compile(r'^/screenshot/(\d+)$')
+
+    class Handler(BaseHTTPRequestHandler):
+        def _send(self, body: bytes, content_type: str, status: int = 200):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Cache-Control', 'no-store')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, data, status: int = 200):
+            self._send(json.dumps(data).encode('utf-8'), 'application/json', status)
+
+        def do_GET(self):
+            match = screenshot_path.match(self.path)
+            if self.path == '/':
+                self._send(REVIEW_PAGE.encode('utf-8'), 'text/html; charset=utf-8')
+            elif self.path == '/api/items':
+                self._send_json({'items': queue.pending(), 'counts': queue.counts()})
+            elif match:
+                image = queue.screenshot(int(match.group(1)))
+                if image is None:
+                    self.send_error(404)
+                else:
+                    self._send(image, 'image/png')
+            else:
+                self.send_error(404)
+
+        def do_POST(self):
+            # Accepts {"answers": [{"id": 1, "verdict": "yes"}, {"id": 2, "verdict": "no", "correct_response": "..."}]}
+            if self.path != '/api/answers':
+                self.send_error(404)
+                return
+            try:
+                answers = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))['answers']
+            except (ValueError, KeyError, TypeError):
+                self._send_json({'error': 'expected {"answers": [...]}'}, 400)
+                return
+            accepted = 0
+            for answer in answers:
+                if not isinstance(answer, dict) or not isinstance(answer.get('id'), int):
+                    continue
+                verdict = answer.get('verdict')
+                correct_response = (answer.get('correct_response') or '').strip()
+                if verdict not in VERDICTS or (verdict == 'no' and not correct_response):
+                    continue
+                reply = {'verdict': verdict, 'correct_response': correct_response} if verdict == 'no' else {'verdict': verdict}
+                accepted += queue.answer(answer['id'], reply)
+            self._send_json({'accepted': accepted})
+
+        def log_message(self, format, *args):
+            pass  # Keep page polls out of the terminal.
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Review hints at http://{host}:{port}/")
+    return server
@@ -0,0 +1,9 @@
+# Reward scales of the two feedback strategies (see feedback_strategies.py), shared by the controller
+# and the offline scripts.
+
+# Binary feedback: accepted hints get +1 and corrected ones -1, so only accepted hints are trained on.
+BINARY_MIN_REWARD = 1
+# Graded feedback: rewards run from 1 to 5 (see similarity_utils.py). With graded rewards we only
+# fine-tune on high-quality examples: a threshold of 3 trains on hints with moderate or better
+# semantic similarity to the reviewer's hint.
+REWARD_THRESHOLD = 3
@@ -1,13 +1,47 @@
+import atexit
+import copy
+import os
+import sys
+import tempfile
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from contextlib import nullcontext
+
+import numpy as np
 import torch
 from torch.utils.data import DataLoader, Dataset
 from torch.optim import Adam
-from transformers import T5Tokenizer, T5ForConditionalGeneration
+from transformers import StoppingCriteria, StoppingCriteriaList
+
+from metrics import METRICS
+from token_store import TokenStore, export_feedback
+
+TRAIN_BATCH_SIZE = 4
+# 'sample' is the original top-k sampler. The other modes are built for short hints: they stop at
+# EOS or a newline, decode at most SHORT_HINT_MAX_NEW_TOKENS tokens, and 'greedy' and 'beam' are
+# deterministic, so their hints can be cached until the next training round.
+DECODING_MODES = ('sample', 'short-sample', 'greedy', 'beam')
+DEFAULT_MAX_NEW_TOKENS = 50
+SHORT_HINT_MAX_NEW_TOKENS = 16
+SHORT_HINT_BEAMS = 2
+HINT_CACHE_SIZE = 1024
+# Hints generated ahead of time for the screens expected next (see speculate()); the oldest are dropped first.
+SPECULATIVE_CACHE_SIZE = 64
+# Seconds to wait for a hint from the inference pool before generating it in-process instead.
+POOL_RESULT_TIMEOUT = 30
+# What happens to the optimizer state between training rounds: 'keep' it in memory, 'free' it
+# (every round starts with fresh moments), or 'offload' it to a file and reload it for the next round.
+OPTIMIZER_STATE_MODES = ('keep', 'free', 'offload')
+# Re-distilling a served student (see distillation.py) uses the newest prompts of the history, for one epoch.
+REDISTILL_MAX_PROMPTS = 512
+REDISTILL_EPOCHS = 1
 
 class FeedbackDataset(Dataset):
     """Custom PyTorch Dataset to handle feedback data for training."""
-    def __init__(self, feedback_data, tokenizer, max_length=512):
-        # We only train on examples where the user provided a correct answer.
-        self.feedback_data = [item for item in feedback_data if item.get('reward', 0) > 0]
+    def __init__(self, feedback_data, tokenizer, max_length=512, is_trainable=None):
+        # By default we only train on examples where the user provided a correct answer.
+        # `is_trainable` lets a feedback strategy decide per item instead (see feedback_strategies.py).
+        is_trainable = is_trainable or (lambda item: item.get('reward', 0) > 0)
+        self.feedback_data = [item for item in feedback_data if is_trainable(item)]
         self.tokenizer = tokenizer
         self.max_length = max_length
 
@@ -34,71 +68,563 @@ class FeedbackDataset(Dataset):
             'labels': target_encoding['input_ids'].squeeze()
         }
 
+class StopOnTokens(StoppingCriteria):
+    """Stops a sequence as soon as it generates one of `token_ids` (e.g. a newline)."""
+    def __init__(self, token_ids):
+        self.token_ids = torch.tensor(sorted(token_ids), dtype=torch.long)
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.isin(input_ids[:, -1], self.token_ids.to(input_ids.device))
+
+class StopOnEvent(StoppingCriteria):
+    """Stops every sequence once `event` is set, so a speculative generation can be cancelled mid-way."""
+    def __init__(self, event):
+        self.event = event
+
+    def __call__(self, input_ids, scores, **kwargs):
+        return torch.full((input_ids.shape[0],), self.event.is_set(), dtype=torch.bool, device=input_ids.device)
+
+def _count_speculative_tokens(future):
+    """Counts the tokens of a speculative hint once its inference pool task is done."""
+    if not future.cancelled() and future.exception() is None:
+        METRICS.increment('speculative_tokens_generated', future.result()[1])
+
+_newline_token_ids = {}
+
+def newline_token_ids(tokenizer) -> set:
+    """Ids of the vocabulary entries that contain a newline (computed once per tokenizer)."""
+    if id(tokenizer) not in _newline_token_ids:
+        tokens = tokenizer.convert_ids_to_tokens(list(range(len(tokenizer))))
+        _newline_token_ids[id(tokenizer)] = {
+            i for i, token in enumerate(tokens) if token and ('\n' in token or token == '<0x0A>')
+        }
+    return _newline_token_ids[id(tokenizer)]
+
+class TokenizedFeedbackDataset(Dataset):
+    """
+    FeedbackDataset over an exported TokenStore (see token_store.py). The ids are already tokenized
+    and are read from the memory-mapped store, so nothing is tokenized and the history is never
+    loaded into memory. Items are identical to FeedbackDataset's.
+    """
+    def __init__(self, store, pad_token_id, max_length=512, min_reward=1, indices=None):
+        # Binary rewards are +1/-1, so min_reward=1 keeps the same items as FeedbackDataset.
+        indices = np.arange(len(store)) if indices is None else np.asarray(indices)
+        self.store = store
+        self.indices = indices[store.rewards[indices] >= min_reward]
+        self.pad_token_id = pad_token_id
+        self.max_length = max_length
+
+    def __len__(self):
+        return len(self.indices)
+
+    def _padded(self, name, index):
+        ids = self.store.row(name, index)[:self.max_length]
+        padded = torch.full((self.max_length,), self.pad_token_id, dtype=torch.long)
+        padded[:len(ids)] = torch.from_numpy(ids.astype(np.int64))
+        return padded, len(ids)
+
+    def __getitem__(self, idx):
+        index = self.indices[idx]
+        input_ids, length = self._padded('prompt_ids', index)
+        attention_mask = torch.zeros(self.max_length, dtype=torch.long)
+        attention_mask[:length] = 1
+        return {
+            'input_ids': input_ids,
+            'attention_mask': attention_mask,
+            'labels': self._padded('target_ids', index)[0]
+        }
+
+def generate_hint(model, tokenizer, prompt, device, max_new_tokens=None, mode='sample', cancel=None):
+    """
+    Generates a hint with the given decoding mode (see DECODING_MODES).
+    Returns the hint and the number of decoder steps.
+    """
+    if mode == 'sample':
+        return sample_hint(model, tokenizer, prompt, device, max_new_tokens or DEFAULT_MAX_NEW_TOKENS, cancel)
+    return generate_hints(model, tokenizer, [prompt], device, max_new_tokens, mode, cancel)[0]
+
+def generate_hints(model, tokenizer, prompts, device, max_new_tokens=None, mode='greedy', cancel=None):
+    """
+    Generates hints for a batch of prompts in one padded generate() call.
+    Returns a (hint, decoder steps) tuple per prompt. In 'sample' mode the batch is sampled with
+    the original settings, but capped at DEFAULT_MAX_NEW_TOKENS new tokens and without the
+    short-hint stopping rules. Setting the optional `cancel` event stops the generation early.
+    """
+    if mode not in DECODING_MODES:
+        raise ValueError(f"Unknown decoding mode '{mode}'. Choose from: {', '.join(DECODING_MODES)}")
+
+    model.eval()
+    inputs = tokenizer(prompts, return_tensors='pt', max_length=512, truncation=True, padding=True)
+    stopping_criteria = StoppingCriteriaList()
+    newline_ids = newline_token_ids(tokenizer)
+    if newline_ids and mode != 'sample':
+        stopping_criteria.append(StopOnTokens(newline_ids))
+    if cancel is not None:
+        stopping_criteria.append(StopOnEvent(cancel))
+    options = {
+        'sample': dict(do_sample=True, temperature=0.6, top_k=40),
+        'short-sample': dict(do_sample=True, temperature=0.6, top_k=40),
+        'greedy': dict(do_sample=False, num_beams=1),
+        'beam': dict(do_sample=False, num_beams=SHORT_HINT_BEAMS, early_stopping=True),
+    }[mode]
+    default_max_new_tokens = DEFAULT_MAX_NEW_TOKENS if mode == 'sample' else SHORT_HINT_MAX_NEW_TOKENS
+
+    with torch.inference_mode():
+        # generate() runs the encoder once and reuses its output (and the decoder's key/value
+        # cache) for every decoding step and beam.
+        generated_outputs = model.generate(
+            input_ids=inputs['input_ids'].to(device),
+            attention_mask=inputs['attention_mask'].to(device),
+            max_new_tokens=max_new_tokens or default_max_new_tokens,
+            stopping_criteria=stopping_criteria,
+            repetition_penalty=1.2,
+            eos_token_id=tokenizer.eos_token_id,
+            pad_token_id=tokenizer.pad_token_id,
+            **options
+        )
+
+    decoded_outputs = tokenizer.batch_decode(generated_outputs, skip_special_tokens=True)
+    # The first column is the decoder start token. Sequences that reached EOS early are padded after it.
+    is_eos = generated_outputs[:, 1:] == tokenizer.eos_token_id
+    steps = torch.where(is_eos.any(dim=1), is_eos.int().argmax(dim=1) + 1, is_eos.shape[1]).tolist()
+    # Cut at the first newline in case it was produced inside a longer token.
+    return [(text.split('\n')[0].strip(), num_steps) for text, num_steps in zip(decoded_outputs, steps)]
+
+def sample_hint(model, tokenizer, prompt, device, max_new_tokens=50, cancel=None):
+    """Samples a hint from the T5 model. Returns the hint and the number of generated tokens."""
+    model.eval()
+    inputs = tokenizer(prompt, return_tensors='pt', max_length=512, truncation=True)
+    input_ids = inputs['input_ids'].to(device)
+    
+    max_length = len(input_ids[0]) + max_new_tokens
+    with torch.no_grad():
+        generated_outputs = model.generate(
+            input_ids=input_ids,
+            max_length=min(max_length, 1024),
+            num_return_sequences=1,
+            temperature=0.6,
+            top_k=40,
+            repetition_penalty=1.2,
+            pad_token_id=tokenizer.eos_token_id,
+            do_sample=True,
+            stopping_criteria=StoppingCriteriaList([StopOnEvent(cancel)]) if cancel is not None else None
+        )
+
+    decoded_output = tokenizer.decode(generated_outputs[0], skip_special_tokens=True)
+    # Encoder-decoder output holds only the decoder tokens (plus the start token).
+    return decoded_output.strip(), generated_outputs.shape[-1] - 1
+
+def make_optimizer(parameters, lr, low_memory=False):
+    """Adam, or in low-memory mode Adafactor, which keeps factored second moments and no first moment."""
+    if low_memory:
+        from transformers.optimization import Adafactor
+        return Adafactor(parameters, lr=lr, scale_parameter=False, relative_step=False, warmup_init=False)
+    return Adam(parameters, lr=lr)
+
+def reset_peak_memory(device):
+    """Starts a new peak-memory measurement where the platform allows it (CUDA, Linux)."""
+    if device.type == 'cuda':
+        torch.cuda.reset_peak_memory_stats(device)
+    elif sys.platform.startswith('linux'):
+        try:
+            with open('/proc/self/clear_refs', 'w') as f:
+                f.write('5')  # Resets VmHWM, the peak resident set size.
+        except OSError:
+            pass
+
+def model_size_mb(model) -> float:
+    """Memory held by a model's parameters and buffers, in MB."""
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors) / 2 ** 20
+
+def peak_memory_mb(device) -> float:
+    """Peak memory since the last reset: allocated memory on a GPU, resident set size on the CPU."""
+    if device.type == 'cuda':
+        return torch.cuda.max_memory_allocated(device) / 2**20
+    if sys.platform.startswith('linux'):
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 2**10
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    # Elsewhere only the peak of the whole process is available; ru_maxrss is in bytes on macOS.
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
 class RLAgent:
     """Manages the T5 model, including text generation and fine-tuning."""
-    def __init__(self, model, tokenizer, lr=5e-5):
+    def __init__(self, model, tokenizer, lr=5e-5, hint_index=None, inference_pool=None, is_trainable=None, min_reward=1,
+                 low_memory=False, optimizer_state='keep', peak_memory_mb=None, decoding='sample', token_store=None,
+                 student=None, redistill_interval=None):
         self.model = model
         self.tokenizer = tokenizer
         self.lr = lr
         self.feedback_data = []
-        self.optimizer = Adam(self.model.parameters(), lr=self.lr)
+        # Optional HintIndex (MultiRL/hint_index.py): near-repeat prompts of a field are answered from
+        # reviewed feedback without running T5.
+        self.hint_index = hint_index
+        # Optional InferencePool: generation runs on worker processes and trained weights are published to them.
+        self.inference_pool = inference_pool
+        # Pool futures started by prefetch(), by prompt, and the prompts each screen (see prefetch()) asked for.
+        self.prefetched = {}
+        self.prefetched_for = {}
+        if decoding not in DECODING_MODES:
+            raise ValueError(f"Unknown decoding mode '{decoding}'. Choose from: {', '.join(DECODING_MODES)}")
+        self.decoding = decoding
+        # Hints of the deterministic decoding modes, by prompt; emptied whenever the weights change.
+        self.hint_cache = {}
+        # Futures of the hints generated ahead of time by speculate(), by prompt; each is served once.
+        self.speculative = {}
+        # Optional token store directory: new feedback is appended to it before every round and
+        # training reads the pre-tokenized, memory-mapped rows instead of tokenizing every record.
+        self.token_store = token_store
+        # Optional per-item training filter (see feedback_strategies.py). Without one, items with a reward of
+        # at least min_reward are trained on (1 for binary feedback), which also works from a token store.
+        self.is_trainable = is_trainable
+        self.min_reward = min_reward
+        if optimizer_state not in OPTIMIZER_STATE_MODES:
+            raise ValueError(f"Unknown optimizer state mode '{optimizer_state}'. "
+                             f"Choose from: {', '.join(OPTIMIZER_STATE_MODES)}")
+        # Low-memory training: Adafactor instead of Adam, and gradient checkpointing during train().
+        self.low_memory = low_memory
+        self.optimizer_state = optimizer_state
+        # File of the offloaded optimizer state, a new one per offload; None while nothing is offloaded.
+        self.optimizer_state_path = None
+        if optimizer_state == 'offload':
+            atexit.register(self._remove_offloaded_optimizer)
+        # Training batches are split into micro-batches (with gradient accumulation), halved whenever
+        # a round pushes peak memory above peak_memory_mb.
+        self.peak_memory_mb = peak_memory_mb
+        self.micro_batch_size = TRAIN_BATCH_SIZE
+        self.optimizer = make_optimizer(self.model.parameters(), self.lr, low_memory) if optimizer_state == 'keep' else None
         self.device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
         self.model.to(self.device)
+        # Optional smaller student model (see distillation.py). It serves every hint while the teacher
+        # (self.model) keeps learning from feedback, and is distilled again from the teacher every
+        # redistill_interval training rounds.
+        self.student = student
+        self.serving_model = student if student is not None else model
+        if student is not None:
+            student.to(self.device)
+            student.eval()
+        self.redistill_interval = redistill_interval
+        self.training_rounds = 0
         print(f"RL Agent initialized on device: {self.device}")
 
-    def generate_response(self, prompt, max_new_tokens=50):
-        """Generates a hint using the T5 model."""
-        self.model.eval()
-        inputs = self.tokenizer(prompt, return_tensors='pt', max_length=512, truncation=True)
-        input_ids = inputs['input_ids'].to(self.device)
-        
-        max_length = len(input_ids[0]) + max_new_tokens
-        with torch.no_grad():
-            generated_outputs = self.model.generate(
-                input_ids=input_ids,
-                max_length=min(max_length, 1024),
-                num_return_sequences=1,
-                temperature=0.6,
-                top_k=40,
-                repetition_penalty=1.2,
-                pad_token_id=self.tokenizer.eos_token_id,
-                do_sample=True
+    def generate_response(self, prompt, max_new_tokens=None):
+        """Generates a hint, reusing an accepted hint for near-repeat prompts when an index is set."""
+        if self.hint_index is not None:
+            match = self.hint_index.lookup(prompt)
+            if match is not None:
+                response, similarity = match
+                METRICS.increment('hint_index_hits')
+                print(f"Reusing reviewed hint (prompt similarity: {similarity:.4f}).")
+                return response
+            METRICS.increment('hint_index_misses')
+
+        if prompt in self.hint_cache:
+            METRICS.increment('hint_cache_hits')
+            return self.hint_cache[prompt]
+
+        if prompt in self.speculative:
+            METRICS.increment('speculative_hits')
+            hint, _ = self._pool_result(self.speculative.pop(prompt), prompt, max_new_tokens)
+            return hint
+
+        if prompt in self.prefetched:
+            # Already submitted to the inference pool by prefetch().
+            hint, num_tokens = self._pool_result(self.prefetched.pop(prompt), prompt, max_new_tokens)
+        elif self.inference_pool is not None:
+            future = self.inference_pool.submit(prompt, max_new_tokens, self.decoding)
+            hint, num_tokens = self._pool_result(future, prompt, max_new_tokens)
+        else:
+            hint, num_tokens = generate_hint(
+                self.serving_model, self.tokenizer, prompt, self.device, max_new_tokens, self.decoding
+            )
+
+        if self.decoding in ('greedy', 'beam'):
+            if len(self.hint_cache) >= HINT_CACHE_SIZE:
+                self.hint_cache.pop(next(iter(self.hint_cache)))
+            self.hint_cache[prompt] = hint
+        METRICS.increment('tokens_generated', num_tokens)
+        METRICS.increment('hints_generated')
+        return hint
+
+    def _pool_result(self, future, prompt, max_new_tokens):
+        """
+        Waits for a hint from the inference pool. If its worker failed or it does not arrive within
+        POOL_RESULT_TIMEOUT seconds, the hint is generated in this process from the published weights.
+        """
+        try:
+            return future.result(timeout=POOL_RESULT_TIMEOUT)
+        except (FutureTimeoutError, RuntimeError) as e:
+            future.cancel()
+            METRICS.increment('inference_pool_fallbacks')
+            reason = 'timed out' if isinstance(e, FutureTimeoutError) else str(e)
+            print(f"Inference pool did not deliver a hint ({reason}); generating it in-process.")
+            return self.inference_pool.generate_locally(prompt, max_new_tokens, self.decoding)
+
+    def prefetch(self, prompts, max_new_tokens=None, screen=None):
+        """
+        Starts generating hints for several prompts at once on the inference pool, so that
+        later generate_response calls for them only wait for the result. A no-op without a pool.
+        Hints prefetched earlier for the same `screen` key (one per device) that are not among
+        `prompts` belong to a screen that is gone, and are dropped.
+        """
+        if self.inference_pool is None:
+            return
+        still_wanted = set().union(*(wanted for key, wanted in self.prefetched_for.items() if key != screen))
+        self._drop_prefetched(set(self.prefetched_for.get(screen, ())) - set(prompts) - still_wanted)
+        self.prefetched_for[screen] = set(prompts)
+        for prompt in prompts:
+            # Prompts the hint index can answer never need the generator.
+            if self.hint_index is not None and self.hint_index.lookup(prompt) is not None:
+                continue
+            if prompt not in self.prefetched and prompt not in self.hint_cache and prompt not in self.speculative:
+                self.prefetched[prompt] = self.inference_pool.submit(prompt, max_new_tokens, self.decoding)
+
+    def speculate(self, prompt, cancel=None, max_new_tokens=None):
+        """
+        Generates a hint ahead of time for a field of a screen that is expected next, and keeps its
+        future for generate_response. Setting the `cancel` event stops the generation early and
+        discards it. With an inference pool the hint is only submitted, so this returns at once;
+        drop_speculative() cancels it if the screen does not come. Returns whether a hint was kept.
+        """
+        if prompt in self.speculative or prompt in self.hint_cache or prompt in self.prefetched:
+            return False
+        if self.hint_index is not None and self.hint_index.lookup(prompt) is not None:
+            return False
+        if self.inference_pool is not None:
+            future = self.inference_pool.submit(prompt, max_new_tokens, self.decoding)
+            future.add_done_callback(_count_speculative_tokens)
+        else:
+            hint, num_tokens = generate_hint(
+                self.serving_model, self.tokenizer, prompt, self.device, max_new_tokens, self.decoding, cancel
             )
+            METRICS.increment('speculative_tokens_generated', num_tokens)
+            if cancel is not None and cancel.is_set():
+                METRICS.increment('speculative_cancelled')
+                return False
+            future = Future()
+            future.set_result((hint, num_tokens))
 
-        decoded_output = self.tokenizer.decode(generated_outputs[0], skip_special_tokens=True)
-        return decoded_output.strip()
+        if len(self.speculative) >= SPECULATIVE_CACHE_SIZE:
+            self.speculative.pop(next(iter(self.speculative))).cancel()
+            METRICS.increment('speculative_evicted')
+        self.speculative[prompt] = future
+        METRICS.increment('speculative_generated')
+        return True
 
-    def store_feedback(self, prompt, generated, correct, reward):
-        """Stores feedback in memory."""
-        self.feedback_data.append({
+    def store_feedback(self, prompt, generated, correct, reward, **details):
+        """Stores feedback in memory. Extra keyword arguments are kept on the record."""
+        item = {
             'prompt': prompt, 'generated_response': generated,
-            'correct_response': correct, 'reward': reward
-        })
+            'correct_response': correct, 'reward': reward, **details
+        }
+        self.feedback_data.append(item)
+        # The reviewer's hint is reused for other prompts of the field, whether it accepted the
+        # generated hint or corrected it (a low reward still comes with the right hint).
+        if self.hint_index is not None and correct:
+            self.hint_index.add(prompt, correct)
         print(f"Stored feedback (Reward: {reward}). Total feedback items: {len(self.feedback_data)}")
 
-    def train(self):
-        """Fine-tunes the model on all collected positive feedback."""
-        positive_feedback_dataset = FeedbackDataset(self.feedback_data, self.tokenizer)
+    def train(self, lock=None):
+        """
+        Fine-tunes the model on all collected positive feedback (and re-distils the student when it is
+        due). When hints are generated from other threads, pass the lock they are generated under: it
+        is then only held to take the feedback and to swap the new weights in, and hints are served
+        from the previous weights meanwhile. Without a student or inference pool to serve them, that
+        takes a copy of the model for the round (its size is the serving_copy_mb gauge); in low-memory
+        mode no copy is made and the lock is held for the whole round instead.
+        """
+        shares_model = lock is not None and self.serving_model is self.model and self.inference_pool is None
+        if shares_model and self.low_memory:
+            with lock:
+                return self.train()
+        with lock or nullcontext():
+            feedback_data = list(self.feedback_data)
+            if shares_model:
+                # Generation would otherwise run on (and switch to eval mode) the model being trained.
+                self.serving_model = copy.deepcopy(self.model).eval()
+                METRICS.set_gauge('serving_copy_mb', model_size_mb(self.serving_model))
+        trained = False
+        try:
+            trained = self._fit(feedback_data)
+        finally:
+            with lock or nullcontext():
+                if self.student is None:
+                    self.serving_model = self.model
+                    if trained:
+                        self._serving_weights_changed()
+                if trained:
+                    self.training_rounds += 1
+        if trained and self.student is not None and self.redistill_interval and self.training_rounds % self.redistill_interval == 0:
+            self.redistill(lock)
+
+    def _fit(self, feedback_data) -> bool:
+        """One training round on the trainable items of `feedback_data`. Returns whether it trained."""
+        # A custom is_trainable filter needs the full records, so it keeps the in-memory dataset.
+        if self.token_store is not None and self.is_trainable is None:
+            positive_feedback_dataset = TokenizedFeedbackDataset(
+                self._updated_token_store(feedback_data), self.tokenizer.pad_token_id, min_reward=self.min_reward
+            )
+        else:
+            positive_feedback_dataset = FeedbackDataset(feedback_data, self.tokenizer, is_trainable=self.trainable)
         if not positive_feedback_dataset:
             print("Training skipped: No positive feedback available.")
-            return
+            return False
 
-        dataloader = DataLoader(positive_feedback_dataset, batch_size=4, shuffle=True)
-        self.model.train()
-        total_loss = 0
-        
-        print(f"Starting training on {len(positive_feedback_dataset)} positive examples...")
-        for batch in dataloader:
-            self.optimizer.zero_grad()
-            outputs = self.model(
-                input_ids=batch['input_ids'].to(self.device),
-                attention_mask=batch['attention_mask'].to(self.device),
-                labels=batch['labels'].to(self.device)
-            )
-            loss = outputs.loss
-            loss.backward()
-            self.optimizer.step()
-            total_loss += loss.item()
+        dataloader = DataLoader(positive_feedback_dataset, batch_size=TRAIN_BATCH_SIZE, shuffle=True)
+        optimizer = self._acquire_optimizer()
+        if self.low_memory:
+            # Recompute activations during the backward pass instead of keeping them all.
+            self.model.gradient_checkpointing_enable()
+        try:
+            reset_peak_memory(self.device)
+            peak_before = peak_memory_mb(self.device)
+            self.model.train()
+            total_loss = 0
+
+            print(f"Starting training on {len(positive_feedback_dataset)} positive examples...")
+            for batch in dataloader:
+                optimizer.zero_grad()
+                batch_size = len(batch['input_ids'])
+                for start in range(0, batch_size, self.micro_batch_size):
+                    micro_batch = {key: value[start:start + self.micro_batch_size].to(self.device) for key, value in batch.items()}
+                    outputs = self.model(**micro_batch)
+                    # Weight each micro-batch by its share of the batch, so accumulation matches one full batch.
+                    loss = outputs.loss * (len(micro_batch['input_ids']) / batch_size)
+                    loss.backward()
+                    total_loss += loss.item()
+                optimizer.step()
+        finally:
+            # Generation must not keep checkpointing on, even after a failed round.
+            if self.low_memory:
+                self.model.gradient_checkpointing_disable()
+        # Gradients are not needed again before the next round.
+        self.model.zero_grad(set_to_none=True)
+        self._release_optimizer(optimizer)
+        self._check_peak_memory(peak_before)
 
+        self.model.eval()
+        METRICS.increment('training_rounds')
+        METRICS.increment('training_examples', len(positive_feedback_dataset))
         print(f"Model fine-tuned. Average Loss: {total_loss / len(dataloader):.4f}")
+        return True
+
+    def redistill(self, lock=None):
+        """
+        Distils the retrained teacher into the served student, on the newest prompts of the feedback
+        history. A copy of the student is distilled, while the student keeps serving hints, and then
+        swapped in; `lock` is as in train().
+        """
+        from distillation import distill, distillation_pairs, history_prompts_and_labels
+
+        with lock or nullcontext():
+            feedback_data = list(self.feedback_data)
+        prompts, labeled = history_prompts_and_labels(
+            feedback_data, self.tokenizer, self.trainable, max_prompts=REDISTILL_MAX_PROMPTS
+        )
+        print(f"Re-distilling the student on {len(prompts)} prompts...")
+        student = copy.deepcopy(self.student)
+        with METRICS.span('distill'):
+            pairs = distillation_pairs(self.model, self.tokenizer, prompts, labeled, self.device)
+            history = distill(self.model, student, self.tokenizer, pairs, self.device,
+                              epochs=REDISTILL_EPOCHS, low_memory=self.low_memory)
+        with lock or nullcontext():
+            self.student = self.serving_model = student
+            self._serving_weights_changed()
+        METRICS.increment('distillation_rounds')
+        if history:
+            print(f"Student re-distilled. Average Loss: {history[-1]['loss']:.4f}")
+
+    def trainable(self, item) -> bool:
+        """Whether a feedback item is trained on."""
+        if self.is_trainable is not None:
+            return self.is_trainable(item)
+        return item.get('reward', 0) >= self.min_reward
+
+    def drop_speculative(self, prompts):
+        """Cancels the speculative hints of `prompts` that are still being generated on the inference pool."""
+        for prompt in prompts:
+            future = self.speculative.get(prompt)
+            # Pool tasks cannot be interrupted; a cancelled one finishes and is discarded.
+            if future is not None and future.cancel():
+                del self.speculative[prompt]
+                METRICS.increment('speculative_cancelled')
+
+    def _drop_prefetched(self, prompts):
+        """Cancels the prefetched generations of `prompts`; one already running finishes and is discarded."""
+        for prompt in prompts:
+            future = self.prefetched.pop(prompt, None)
+            if future is not None:
+                future.cancel()
+                METRICS.increment('prefetch_dropped')
+
+    def _serving_weights_changed(self):
+        """Drops the hints of the old serving weights and publishes the new ones to the inference pool."""
+        self.hint_cache.clear()
+        self.drop_speculative(list(self.speculative))
+        self.speculative.clear()
+        self._drop_prefetched(list(self.prefetched))
+        self.prefetched_for.clear()
+        if self.inference_pool is not None:
+            self.inference_pool.publish(self.serving_model)
+
+    def _acquire_optimizer(self):
+        """Returns the optimizer for a training round, recreating (and reloading) it if it was freed or offloaded."""
+        if self.optimizer is not None:
+            return self.optimizer
+        optimizer = make_optimizer(self.model.parameters(), self.lr, self.low_memory)
+        if self.optimizer_state_path is not None:
+            optimizer.load_state_dict(torch.load(self.optimizer_state_path, map_location=self.device))
+            # The state now lives in memory again until the round ends.
+            self._remove_offloaded_optimizer()
+        return optimizer
+
+    def _remove_offloaded_optimizer(self):
+        """Deletes the offloaded optimizer state file, if there is one."""
+        if self.optimizer_state_path is not None:
+            try:
+                os.remove(self.optimizer_state_path)
+            except FileNotFoundError:
+                pass
+            self.optimizer_state_path = None
+
+    def _release_optimizer(self, optimizer):
+        """Keeps, frees or offloads the optimizer state after a training round."""
+        if self.optimizer_state == 'keep':
+            self.optimizer = optimizer
+            return
+        if self.optimizer_state == 'offload':
+            # Unique per agent and offload, so several agents in one process never share a file.
+            fd, self.optimizer_state_path = tempfile.mkstemp(prefix='hintqt5-optimizer-', suffix='.pt')
+            os.close(fd)
+            torch.save(optimizer.state_dict(), self.optimizer_state_path)
+        self.optimizer = None
+
+    def _check_peak_memory(self, peak_before):
+        """Records the training peak and shrinks the micro-batches if the round went over the target."""
+        peak = peak_memory_mb(self.device)
+        METRICS.set_gauge('training_peak_memory_mb', peak)
+        if self.peak_memory_mb is None:
+            return
+        # Where the peak cannot be reset it covers the whole process, so only a round that raised it counts.
+        if peak > self.peak_memory_mb and peak > peak_before and self.micro_batch_size > 1:
+            self.micro_batch_size //= 2
+            print(f"Training peaked at {peak:.0f} MB (target {self.peak_memory_mb} MB). "
+                  f"Micro-batch size reduced to {self.micro_batch_size}.")
 
+    def _updated_token_store(self, feedback_data):
+        """Appends new feedback to the token store (rebuilding it if it no longer matches) and opens it."""
+        try:
+            appended = export_feedback(feedback_data, self.tokenizer, self.token_store)
+        except ValueError as e:
+            print(f"{e} Rebuilding it.")
+            appended = export_feedback(feedback_data, self.tokenizer, self.token_store, rebuild=True)
+        store = TokenStore(self.token_store)
+        print(f"Token store '{self.token_store}': {appended} new records, {len(store)} in total.")
+        return store
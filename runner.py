@@ -0,0 +1,528 @@
+import time
+# Taken before any other import, so the time to first hint covers the whole start-up.
+PROCESS_START = time.perf_counter()
+import argparse
+import hashlib
+import os
+import pprint
+import sys
+import threading
+from contextlib import nullcontext
+
+# The graded strategy uses the similarity code and hint index in MultiRL, which holds only the
+# graded-only modules; everything else is shared from this folder.
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(REPO_ROOT, 'MultiRL'))
+
+# Import from our custom modules. torch, transformers, sentence-transformers, uiautomator2 and
+# xmltodict are imported inside main(), so the models can start loading before they are all in.
+from ui_utils import get_all_components, find_edit_text, parse_bounds, choose_from_pos
+from prompt_generator import use_context_info_generate_prompt, ScreenComponentCache
+from feedback_manager import load_feedback, save_feedback
+from display_utils import OVERLAY_PORT, SCREENSHOT_FLUSH_TIMEOUT, AsyncDisplayTransport, OverlayClient
+from feedback_strategies import STRATEGIES, GradedFeedback
+from metrics import METRICS
+from profiling import Profiler, PROFILE_MODES
+from model_loader import BackgroundLoader, load_model, load_tokenizer
+from review_queue import ReviewQueue, ReviewWorker, crop_screenshot, start_review_server
+from navigation_graph import NavigationGraph, RequestGate, SpeculativePrefetcher, screen_app, screen_fingerprint
+
+def parse_args(default_strategy='binary'):
+    """Parses the command-line switches of the controller."""
+    parser = argparse.ArgumentParser(
+        description="Generate hint texts for input fields on one or more connected Android devices, "
+                    "with binary and/or graded feedback."
+    )
+    parser.add_argument('--device', action='append', default=[], metavar='SERIAL=STRATEGY',
+                        help="A device serial and its feedback strategy (binary or graded). Repeat for more devices.")
+    parser.add_argument('--strategy', choices=sorted(STRATEGIES), default=default_strategy,
+                        help=f"Feedback strategy for the default device when no --device is given (default: {default_strategy}).")
+    parser.add_argument('--profile', choices=PROFILE_MODES, default=None,
+                        help="Profile generate_response and train with cProfile ('cpu') or torch.profiler ('torch').")
+    parser.add_argument('--profile-dir', default='profiles', help="Directory for the profile files of each run.")
+    parser.add_argument('--profile-window', type=int, default=5,
+                        help="Number of calls of each profiled function to record.")
+    parser.add_argument('--profile-loop', action='store_true',
+                        help="Also profile whole main-loop iterations (within the same window).")
+    return parser.parse_args()
+
+def parse_devices(args) -> list:
+    """Returns [(serial or None, strategy name)] from the --device switches."""
+    if not args.device:
+        return [(None, args.strategy)]
+    devices = []
+    for spec in args.device:
+        serial, _, strategy = spec.partition('=')
+        strategy = strategy or args.strategy
+        if strategy not in STRATEGIES:
+            raise SystemExit(f"Unknown feedback strategy '{strategy}' for device '{serial}'. "
+                             f"Choose from: {', '.join(sorted(STRATEGIES))}")
+        devices.append((serial, strategy))
+    return devices
+
+def create_agent(loader, model_path, feedback_data, is_trainable, min_reward, use_hint_index,
+                 inference_workers, threads_per_worker, training_options):
+    """
+    Waits for the background model loads and builds the RLAgent on `feedback_data`, trained on the items
+    `is_trainable` accepts or, without it, those with a reward of at least `min_reward`.
+    Returns None if loading failed.
+    """
+    try:
+        tokenizer = loader.result('tokenizer')
+        model = loader.result('model')
+        # Optional student model that serves the hints (STUDENT_PATH).
+        student = loader.result('student') if 'student' in loader.futures else None
+        # Only loaded for graded feedback.
+        similarity_model = loader.result('similarity') if 'similarity' in loader.futures else None
+    except Exception as e:
+        print(f"FATAL ERROR: Could not load a required model from '{model_path}' (or the student or similarity model).")
+        print(f"Please check the paths and ensure 'sentence-transformers' is installed for graded feedback. Details: {e}")
+        return None
+
+    from rl_agent import RLAgent
+    from inference_pool import InferencePool
+
+    hint_index = None
+    if use_hint_index and similarity_model is not None:
+        if similarity_model.retrieval_threshold is None:
+            print("Hint index disabled: run MultiRL/calibrate_similarity.py for this similarity backend to enable it.")
+        else:
+            from hint_index import HintIndex
+            hint_index = HintIndex(similarity_model.encode, threshold=similarity_model.retrieval_threshold)
+            # Every reviewed hint is indexed, corrections included (see RLAgent.store_feedback).
+            hint_index.add_many(
+                [item.get('prompt') for item in feedback_data],
+                [item.get('correct_response') for item in feedback_data]
+            )
+            print(f"Hint index built with {len(hint_index)} reviewed prompts.")
+
+    inference_pool = None
+    if inference_workers:
+        inference_pool = InferencePool(student or model, tokenizer, inference_workers, threads_per_worker)
+    rl_agent = RLAgent(
+        model, tokenizer, hint_index=hint_index, inference_pool=inference_pool, is_trainable=is_trainable,
+        min_reward=min_reward, student=student, **training_options
+    )
+    rl_agent.feedback_data = feedback_data
+    return rl_agent
+
+class SharedAgent:
+    """
+    One RLAgent shared by every device session. It is created on the first screen with input
+    fields, once the models have loaded in the background. Generation and storing feedback are
+    serialized on one lock, which training rounds (run on a background thread) only take to start
+    and to swap in the new weights. Reviewer prompts are serialized on another lock so questions
+    for different devices do not interleave in the terminal.
+    """
+    def __init__(self, loader, strategies: dict, profiler: Profiler, config: dict):
+        self.loader = loader
+        self.strategies = strategies
+        self.profiler = profiler
+        self.config = config
+        self.training_interval = config['training_interval']
+        self.rl_agent = None
+        self.agent_lock = threading.Lock()
+        self.review_lock = threading.Lock()
+        self.feedback_lock = threading.Lock()
+        self._create_lock = threading.Lock()
+        # User-facing requests for the agent lock, which speculative generation gives way to.
+        self.requests = RequestGate()
+        self._create_failed = False
+        self.first_hint_shown = False
+        self.new_feedback_count = 0
+        self.training = False
+        # Each strategy keeps its own feedback file, in the format of its original entry point.
+        self.saved_feedback = {name: load_feedback(strategy.feedback_file) for name, strategy in strategies.items()}
+
+    def is_trainable(self, item: dict) -> bool:
+        """Every item is judged by the strategy that collected it."""
+        return self.strategies[item['feedback_mode']].is_trainable(item)
+
+    def ensure_agent(self) -> bool:
+        """Creates the agent on first use, waiting for the models. Returns False if they could not be loaded."""
+        with self._create_lock:
+            if self.rl_agent is None and not self._create_failed:
+                feedback_data = [
+                    dict(item, feedback_mode=name) for name, items in self.saved_feedback.items() for item in items
+                ]
+                # A single strategy needs no per-item filter, which lets training read a token store.
+                single = next(iter(self.strategies.values())) if len(self.strategies) == 1 else None
+                rl_agent = create_agent(
+                    self.loader, self.config['model_path'], feedback_data,
+                    None if single else self.is_trainable, single.min_reward if single else 1,
+                    self.config['use_hint_index'], self.config['inference_workers'], self.config['threads_per_worker'],
+                    self.config['training_options']
+                )
+                if rl_agent is None:
+                    self._create_failed = True
+                    return False
+                if GradedFeedback.name in self.strategies:
+                    self.strategies[GradedFeedback.name].similarity_model = self.loader.result('similarity')
+                self.profiler.instrument(rl_agent, 'generate_response')
+                self.profiler.instrument(rl_agent, 'train')
+                self.rl_agent = rl_agent
+                if self.config['review_queue'] is not None:
+                    # Started now that there is an agent; answers given before this wait in the queue.
+                    ReviewWorker(self.config['review_queue'], self.record_answer)
+            return self.rl_agent is not None
+
+    def prefetch(self, prompts: list, serial=None):
+        with self.requests.request(), self.agent_lock:
+            self.rl_agent.prefetch(prompts, screen=serial)
+
+    def generate(self, prompt: str) -> str:
+        with self.requests.request(), self.agent_lock:
+            return self.rl_agent.generate_response(prompt)
+
+    def hint_shown(self):
+        """Records the time to the first hint of the session."""
+        with self._create_lock:
+            if self.first_hint_shown:
+                return
+            self.first_hint_shown = True
+        time_to_first_hint = time.perf_counter() - PROCESS_START
+        METRICS.observe('time_to_first_hint', time_to_first_hint)
+        print(f"Time to first hint: {time_to_first_hint:.1f}s")
+
+    def review(self, strategy, generated_hint: str, label: str):
+        """Runs the strategy's reviewer questions for one hint, prefixed with the device label."""
+        # Time spent waiting for the reviewer is left out of the profile.
+        with self.review_lock, self.profiler.paused():
+            return strategy.collect(generated_hint, lambda question: input(f"[{label}] {question}"))
+
+    def record(self, strategy, prompt: str, generated_hint: str, feedback: dict):
+        """Stores and persists one feedback item, and starts training once enough new items have arrived."""
+        item = {
+            "prompt": prompt, "generated_response": generated_hint,
+            "correct_response": feedback['correct_response'], "reward": feedback['reward'], **feedback['details']
+        }
+        with self.requests.request(), self.agent_lock:
+            self.rl_agent.store_feedback(
+                prompt, generated_hint, feedback['correct_response'], feedback['reward'],
+                feedback_mode=strategy.name, **feedback['details']
+            )
+        with self.feedback_lock:
+            self.saved_feedback[strategy.name].append(item)
+            with METRICS.span('save_feedback'):
+                save_feedback(self.saved_feedback[strategy.name], strategy.feedback_file)
+            METRICS.increment('feedback_items')
+            self.new_feedback_count += 1
+
+            if self.new_feedback_count < self.training_interval:
+                print(f"Feedback stored. Training will occur in "
+                      f"{self.training_interval - self.new_feedback_count} more items.")
+            elif self.training:
+                print("Feedback stored. Training will start after the current round.")
+            else:
+                print(f"\nCollected {self.new_feedback_count} new feedback items. Starting training in the background...")
+                self.new_feedback_count = 0
+                self.training = True
+                threading.Thread(target=self._train_rounds, name='training', daemon=True).start()
+
+    def _train_rounds(self):
+        """
+        Trains until fewer than training_interval items arrived during the last round. Hints keep
+        being served, from the previous weights, while a round runs.
+        """
+        while True:
+            try:
+                with METRICS.span('train'):
+                    self.rl_agent.train(lock=self.agent_lock)
+            except Exception as e:
+                print(f"Error during training: {e}")
+            with self.feedback_lock:
+                if self.new_feedback_count < self.training_interval:
+                    self.training = False
+                    return
+                print(f"\nCollected {self.new_feedback_count} new feedback items during training. Starting another round...")
+                self.new_feedback_count = 0
+
+    def record_answer(self, item: dict) -> bool:
+        """
+        Stores a reviewer's answer from the review page with the strategy that queued the hint.
+        Returns False, leaving the answer in the queue, if that strategy is not loaded in this run.
+        """
+        strategy = self.strategies.get(item['context'].get('feedback_mode'))
+        if strategy is None:
+            print(f"Keeping review answer {item['id']} for a later run: its feedback strategy is not loaded in this run.")
+            return False
+        print(f"\nReview answer for '{item['generated_response']}': {item['answer']['verdict']}")
+        feedback = strategy.from_answer(item['generated_response'], item['answer'])
+        if feedback is not None:
+            self.record(strategy, item['prompt'], item['generated_response'], feedback)
+        return True
+
+def run_device(shared: SharedAgent, serial, strategy, local_port: int, config: dict):
+    """The main loop for one device, using the shared agent and the given feedback strategy."""
+    import uiautomator2 as u2
+    import xmltodict
+
+    label = f"{serial or 'default'}/{strategy.name}"
+    display = AsyncDisplayTransport(OverlayClient(serial=serial, local_port=local_port))
+    profiler = shared.profiler
+    navigation_graph = config['navigation_graph']
+    # Started with the agent.
+    prefetcher = None
+    count_tokens = lambda text: len(shared.loader.result('tokenizer').tokenize(text))
+    last_hierarchy_hash = None
+    last_fingerprint = None
+    screen_cache = ScreenComponentCache(count_tokens)
+    processed_components_on_screen = set()
+
+    while True:
+        with profiler.section('loop_iteration') if config['profile_loop'] else nullcontext():
+            try:
+                print(f'\n[{label}] Attempting to connect to device...')
+                d = u2.connect(serial)
+                print(f'[{label}] Device connected successfully.')
+
+                with METRICS.span('dump_hierarchy'):
+                    page_source = d.dump_hierarchy(compressed=True, pretty=True)
+
+                # Check if the UI has changed since the last loop
+                current_hash = hashlib.md5(page_source.encode('utf-8')).hexdigest()
+                if current_hash == last_hierarchy_hash:
+                    METRICS.increment('screens_unchanged')
+                    print(f"[{label}] UI has not changed. Waiting...")
+                    with profiler.paused():
+                        time.sleep(5)
+                    continue
+
+                print(f"\n[{label}] UI has changed. Processing new screen...")
+                last_hierarchy_hash = current_hash
+                processed_components_on_screen.clear()
+                screen_cache = ScreenComponentCache(count_tokens)
+                # Hints of the previous screen no longer line up with anything.
+                display.clear()
+
+                METRICS.increment('screens_processed')
+                with METRICS.span('xmltodict_parse'):
+                    data_dict = xmltodict.parse(page_source)
+                all_components = get_all_components(data_dict)
+                actionable_components = [
+                    e for e in find_edit_text(data_dict) if not e.get('@content-desc')
+                ]
+
+                if not actionable_components:
+                    print(f"[{label}] No input fields needing hints on this screen.")
+                elif not shared.ensure_agent():
+                    return
+                elif navigation_graph is not None and prefetcher is None:
+                    prefetcher = SpeculativePrefetcher(shared.rl_agent, shared.agent_lock, shared.requests)
+
+                screen_height = d.info['displayHeight']
+                screen_width = d.info['displayWidth']
+
+                # Build every field's prompt first, so the inference pool (if enabled) can generate all hints in parallel.
+                field_prompts = []
+                for e_component in actionable_components:
+                    bounds = e_component.get('@bounds', '')
+                    component_id = f"{bounds}-{e_component.get('@resource-id', '')}"
+                    if component_id in processed_components_on_screen:
+                        continue
+
+                    # Copy the cached info so the per-field neighbour list does not leak into the cache.
+                    dict_info = dict(screen_cache.basic_info(e_component))
+                    with METRICS.span('choose_from_pos'):
+                        nearby_components = choose_from_pos(all_components, bounds, screen_height, screen_width)
+                    dict_info['nearby-components'] = [screen_cache.basic_info(e_near) for e_near in nearby_components]
+                    with METRICS.span('build_prompt'):
+                        final_text_prompt = use_context_info_generate_prompt(
+                            dict_info, screen_height, screen_width,
+                            token_budget=config['prompt_token_budget'], cache=screen_cache
+                        )
+                    field_prompts.append((e_component, bounds, component_id, final_text_prompt))
+
+                fingerprint = screen_fingerprint(all_components)
+                screen_prompts = [final_text_prompt for *_, final_text_prompt in field_prompts]
+                if prefetcher is not None:
+                    # Speculative work for screens that did not come is dropped; this screen's hints come first.
+                    prefetcher.cancel(keep=screen_prompts)
+                if navigation_graph is not None:
+                    navigation_graph.visit(last_fingerprint, fingerprint, screen_app(all_components), screen_prompts)
+                last_fingerprint = fingerprint
+
+                review_queue = config['review_queue']
+                screenshot = None
+                if field_prompts:
+                    shared.prefetch(screen_prompts, serial)
+                    if review_queue is not None:
+                        try:
+                            # The previous screen's hints must be gone from the screenshot.
+                            display.flush(SCREENSHOT_FLUSH_TIMEOUT)
+                            with METRICS.span('screenshot'):
+                                screenshot = d.screenshot()
+                        except Exception as e:
+                            print(f"[{label}] Could not take a screenshot for review: {e}")
+
+                for e_component, bounds, component_id, final_text_prompt in field_prompts:
+                    print('-----------------------------------------')
+                    pprint.pprint(e_component)
+                    print("\nGenerated Prompt for AI:\n", final_text_prompt)
+
+                    try:
+                        with METRICS.span('generate_response'):
+                            generated_hint = shared.generate(final_text_prompt)
+
+                        print("\n=========================================")
+                        print(f" [{label}] HINT SUGGESTION: '{generated_hint}'")
+                        print("=========================================")
+
+                        display.show_hints([(parse_bounds(bounds), generated_hint)])
+                        shared.hint_shown()
+
+                        if review_queue is not None:
+                            # Reviewed on the review page; the answer is stored by the review worker.
+                            item_id = review_queue.enqueue(
+                                final_text_prompt, generated_hint,
+                                {'device': label, 'feedback_mode': strategy.name, 'field': e_component.get('@resource-id', '')},
+                                crop_screenshot(screenshot, parse_bounds(bounds))
+                            )
+                            if item_id is None:
+                                print(f"[{label}] The same hint is already waiting for review.")
+                            else:
+                                METRICS.increment('review_items_queued')
+                                print(f"[{label}] Hint queued for review.")
+                            continue
+
+                        feedback = shared.review(strategy, generated_hint, label)
+                        if feedback is None:
+                            continue
+
+                        if feedback['show_correction']:
+                            print(f"\n[{label}] --- LEARNING HINT: '{feedback['correct_response']}' ---")
+                            display.show_hints([(parse_bounds(bounds), feedback['correct_response'])])
+
+                        shared.record(strategy, final_text_prompt, generated_hint, feedback)
+
+                    except Exception as e:
+                        print(f"[{label}] Error during hint generation/feedback loop: {e}")
+
+                    finally:
+                        processed_components_on_screen.add(component_id)
+                        METRICS.export_json(config['metrics_file'])
+
+                if prefetcher is not None:
+                    # The device is idle until the next screen: get its likely successors' hints ready.
+                    prefetcher.schedule(navigation_graph.predicted_prompts(fingerprint, config['prefetch_budget']))
+
+            except Exception as e:
+                print(f"[{label}] An error occurred in the main loop: {e}")
+                print(f"[{label}] Will attempt to reconnect after a delay.")
+
+        # Outside the profiled loop iteration: only the work of an iteration is recorded.
+        print(f"\n[{label}] Waiting for 15 seconds before next cycle...")
+        time.sleep(15)
+
+def main(default_strategy='binary'):
+    """
+    Loads the model once and serves every configured device, each with its own feedback strategy.
+    main.py (binary) and MultiRL/main.py (graded) run this with their own default strategy.
+    """
+    args = parse_args(default_strategy)
+    devices = parse_devices(args)
+    # --- CONFIGURATION ---
+    # IMPORTANT: Update this path to where your T5 model is located on your computer.
+    MODEL_PATH = '/Users/sanvishukla/Desktop/SRIP/fine-tuned-model-T5'
+    # New feedback items (from all devices together) collected before retraining the model.
+    TRAINING_INTERVAL = 5
+    # Maximum prompt length in tokens; the least useful nearby context is dropped to stay within it.
+    PROMPT_TOKEN_BUDGET = 480
+    # Per-stage timings and counters are written here after every field, and served for Prometheus
+    # at http://127.0.0.1:METRICS_PORT/metrics (set METRICS_PORT to None to disable the endpoint).
+    METRICS_FILE = "metrics.json"
+    METRICS_PORT = 9464
+    # Number of worker processes generating hints in parallel (0 generates on this process).
+    # Each worker uses INFERENCE_THREADS_PER_WORKER torch threads; workers x threads should not exceed the cores.
+    INFERENCE_WORKERS = 0
+    INFERENCE_THREADS_PER_WORKER = 2
+    # Low-memory training for larger T5 variants: Adafactor instead of Adam plus gradient checkpointing.
+    # 'optimizer_state' is 'keep', 'free' (drop it after each round) or 'offload' (to a temporary file).
+    # With 'peak_memory_mb' set, training micro-batches shrink whenever a round goes over it.
+    # Set 'token_store' to a directory (e.g. 'feedback_tokens') to keep a pre-tokenized, memory-mapped copy of
+    # the feedback for training (see token_store.py); it is only used when every device has the same strategy.
+    TRAINING_OPTIONS = {'low_memory': False, 'optimizer_state': 'keep', 'peak_memory_mb': None, 'token_store': None}
+    # 'sample' (top-k sampling), or a short-hint mode that stops at EOS/newline within a few tokens:
+    # 'short-sample', 'greedy' or 'beam'. The last two are deterministic and cache their hints.
+    DECODING_MODE = 'sample'
+    # Optional smaller student distilled from MODEL_PATH with distillation.py. When set, it serves the hints
+    # while the model at MODEL_PATH keeps learning from feedback, and is distilled again from it every
+    # REDISTILL_INTERVAL training rounds (None: never).
+    STUDENT_PATH = None
+    REDISTILL_INTERVAL = 3
+    # Similarity backend used for graded rewards: 'sentence-transformer', 'quantized', 'onnx' or 'lexical'.
+    # Run MultiRL/calibrate_similarity.py once for any backend other than the default.
+    SIMILARITY_BACKEND = 'sentence-transformer'
+    # With graded feedback, prompts of a field nearly identical to an already-reviewed prompt of that field
+    # reuse its accepted hint instead of running T5. The similarity threshold depends on the backend
+    # (see MultiRL/calibrate_similarity.py). Set to False to always generate.
+    USE_HINT_INDEX = True
+    # Set to a port (e.g. 8780) to review hints on a local web page at http://127.0.0.1:REVIEW_PORT/
+    # instead of answering in the terminal. Hints of every device are queued (with a screenshot of the field)
+    # and the controller moves on; answers are stored and trained on in the background as they arrive.
+    # The overlay connections use OVERLAY_PORT (8765) and the ports after it, one per device.
+    REVIEW_PORT = None
+    # Speculative prefetch: the controller learns which screens usually follow which (navigation_graph.json)
+    # and, while the device is idle, generates hints for the fields of the likeliest next screens.
+    # At most PREFETCH_BUDGET hints are generated ahead per screen; set it to 0 to disable.
+    PREFETCH_BUDGET = 8
+
+    # Only the strategies of the configured devices are built, so each run only loads (and trains on)
+    # the feedback files it uses.
+    strategies = {name: STRATEGIES[name]() for name in dict.fromkeys(strategy for _, strategy in devices)}
+
+    # The models load in the background while the devices are connected and their first screens dumped.
+    print("Loading the models in the background...")
+    loader = BackgroundLoader()
+    loader.start('tokenizer', load_tokenizer, MODEL_PATH)
+    loader.start('model', load_model, MODEL_PATH)
+    if STUDENT_PATH is not None:
+        loader.start('student', load_model, STUDENT_PATH)
+    if GradedFeedback.name in strategies:
+        from similarity_utils import CALIBRATION_FILE, SimilarityModel
+        # The calibration is read from MultiRL, where calibrate_similarity.py writes it.
+        loader.start('similarity', SimilarityModel, None, SIMILARITY_BACKEND,
+                     os.path.join(REPO_ROOT, 'MultiRL', CALIBRATION_FILE))
+
+    if METRICS_PORT is not None:
+        try:
+            METRICS.start_prometheus_server(METRICS_PORT)
+        except OSError as e:
+            print(f"Could not start the metrics endpoint on port {METRICS_PORT}: {e}")
+
+    review_queue = None
+    if REVIEW_PORT is not None:
+        review_queue = ReviewQueue()
+        start_review_server(review_queue, REVIEW_PORT)
+
+    # Profiling is off unless requested; the methods are then left untouched.
+    profiler = Profiler(args.profile, args.profile_dir, args.profile_window)
+
+    config = {
+        'model_path': MODEL_PATH, 'training_interval': TRAINING_INTERVAL, 'prompt_token_budget': PROMPT_TOKEN_BUDGET,
+        'metrics_file': METRICS_FILE, 'inference_workers': INFERENCE_WORKERS,
+        'threads_per_worker': INFERENCE_THREADS_PER_WORKER,
+        'training_options': dict(TRAINING_OPTIONS, decoding=DECODING_MODE, redistill_interval=REDISTILL_INTERVAL),
+        'use_hint_index': USE_HINT_INDEX, 'review_queue': review_queue, 'prefetch_budget': PREFETCH_BUDGET,
+        'navigation_graph': NavigationGraph() if PREFETCH_BUDGET else None, 'profile_loop': args.profile_loop,
+    }
+    shared = SharedAgent(loader, strategies, profiler, config)
+
+    threads = []
+    for i, (serial, strategy) in enumerate(devices):
+        # Every device gets its own local port for the overlay connection.
+        thread = threading.Thread(
+            target=run_device, args=(shared, serial, strategies[strategy], OVERLAY_PORT + i, config), daemon=True
+        )
+        thread.start()
+        threads.append(thread)
+        print(f"Serving device '{serial or 'default'}' with {strategy} feedback.")
+
+    try:
+        for thread in threads:
+            thread.join()
+    except KeyboardInterrupt:
+        print("\nStopping.")
+
+if __name__ == "__main__":
+    main()
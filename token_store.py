@@ -0,0 +1,178 @@
+import argparse
+import hashlib
+import json
+import os
+
+import numpy as np
+
+from feedback_manager import FEEDBACK_FILE, load_feedback
+
+TOKEN_STORE_DIR = "feedback_tokens"
+META_FILE = "meta.json"
+# Variable-length columns: a flat value buffer plus an int64 offsets file with one more entry than rows.
+RAGGED_COLUMNS = {
+    'prompt_ids': np.int32, 'target_ids': np.int32,
+    'prompt_text': np.uint8, 'correct_text': np.uint8,
+}
+# One value per row.
+FIXED_COLUMNS = {'reward': np.float32, 'record_hash': np.uint64}
+
+def record_hash(item: dict) -> int:
+    """A stable 64-bit hash of a feedback record, used to skip duplicate records."""
+    digest = hashlib.blake2b(json.dumps(item, sort_keys=True).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+def _tokenizer_id(tokenizer) -> dict:
+    return {'name_or_path': str(getattr(tokenizer, 'name_or_path', '')), 'vocab_size': len(tokenizer)}
+
+class TokenStore:
+    """
+    Read-only, memory-mapped view of an exported feedback store. Every column is a flat file
+    (see RAGGED_COLUMNS and FIXED_COLUMNS), so opening it costs the same for ten rows or ten million,
+    and rows are numpy views into the mapped files rather than copies.
+    """
+    def __init__(self, path: str = TOKEN_STORE_DIR):
+        self.path = path
+        with open(os.path.join(path, META_FILE), 'r') as f:
+            self.meta = json.load(f)
+        self.count = self.meta['count']
+        self.columns = {}
+        self.offsets = {}
+        for name, dtype in RAGGED_COLUMNS.items():
+            self.offsets[name] = self._map(f'{name}.offsets', np.int64, self.count + 1)
+            self.columns[name] = self._map(name, dtype, int(self.offsets[name][-1]))
+        for name, dtype in FIXED_COLUMNS.items():
+            self.columns[name] = self._map(name, dtype, self.count)
+
+    def _map(self, name, dtype, length):
+        # Files may hold a few trailing values from an interrupted append; only `length` are valid.
+        if length == 0:
+            return np.zeros(0, dtype=dtype)
+        return np.memmap(os.path.join(self.path, f'{name}.bin'), dtype=dtype, mode='r', shape=(length,))
+
+    def __len__(self):
+        return self.count
+
+    def row(self, name: str, index: int) -> np.ndarray:
+        """The values of a variable-length column for one row (a view, not a copy)."""
+        offsets = self.offsets[name]
+        return self.columns[name][offsets[index]:offsets[index + 1]]
+
+    def text(self, name: str, index: int) -> str:
+        return self.row(name, index).tobytes().decode('utf-8')
+
+    @property
+    def rewards(self) -> np.ndarray:
+        return self.columns['reward']
+
+    def unique_indices(self) -> np.ndarray:
+        """Row indices with duplicate records removed (the first copy is kept)."""
+        _, first = np.unique(self.columns['record_hash'], return_index=True)
+        return np.sort(first)
+
+def split_indices(store: TokenStore, val_fraction: float, seed: int) -> tuple:
+    """Seeded training/validation split of the de-duplicated rows, as split_feedback does for records."""
+    indices = store.unique_indices()
+    np.random.default_rng(seed).shuffle(indices)
+    num_val = int(len(indices) * val_fraction)
+    return indices[num_val:], indices[:num_val]
+
+def export_feedback(feedback_data: list, tokenizer, path: str = TOKEN_STORE_DIR, max_length: int = 512,
+                    rebuild: bool = False, chunk_size: int = 1024) -> int:
+    """
+    Appends the records of `feedback_data` that are not in the store yet (the feedback list only
+    ever grows, so these are the records past the stored count), tokenized with `tokenizer`.
+    The metadata is rewritten last, so an interrupted export leaves the previous rows readable.
+    Returns the number of rows appended.
+    """
+    os.makedirs(path, exist_ok=True)
+    meta_path = os.path.join(path, META_FILE)
+    meta = None
+    if os.path.exists(meta_path) and not rebuild:
+        with open(meta_path, 'r') as f:
+            meta = json.load(f)
+        if meta['tokenizer'] != _tokenizer_id(tokenizer) or meta['max_length'] != max_length:
+            raise ValueError(f"The token store in '{path}' was written with a different tokenizer or max_length. "
+                             f"Export again with rebuild=True (--rebuild).")
+    if meta is None:
+        meta = {'count': 0, 'tokenizer': _tokenizer_id(tokenizer), 'max_length': max_length}
+        for name in list(RAGGED_COLUMNS) + list(FIXED_COLUMNS):
+            open(os.path.join(path, f'{name}.bin'), 'wb').close()
+        for name in RAGGED_COLUMNS:
+            np.zeros(1, dtype=np.int64).tofile(os.path.join(path, f'{name}.offsets.bin'))
+
+    count = meta['count']
+    if count and (len(feedback_data) < count or record_hash(feedback_data[count - 1]) != int(
+            np.fromfile(os.path.join(path, 'record_hash.bin'), dtype=np.uint64, count=1, offset=(count - 1) * 8)[0])):
+        raise ValueError(f"The token store in '{path}' does not match this feedback history (was it regraded "
+                         f"or replaced?). Export again with rebuild=True (--rebuild).")
+    new_items = feedback_data[count:]
+    if not new_items:
+        return 0
+
+    # Drop anything an interrupted export wrote after the last committed row.
+    ends = {}
+    for name, dtype in RAGGED_COLUMNS.items():
+        offsets_path = os.path.join(path, f'{name}.offsets.bin')
+        offsets = np.fromfile(offsets_path, dtype=np.int64, count=count + 1)
+        ends[name] = int(offsets[-1])
+        os.truncate(offsets_path, (count + 1) * 8)
+        os.truncate(os.path.join(path, f'{name}.bin'), ends[name] * np.dtype(dtype).itemsize)
+    for name, dtype in FIXED_COLUMNS.items():
+        os.truncate(os.path.join(path, f'{name}.bin'), count * np.dtype(dtype).itemsize)
+
+    for start in range(0, len(new_items), chunk_size):
+        chunk = new_items[start:start + chunk_size]
+        prompts = [item.get('prompt') or '' for item in chunk]
+        corrects = [item.get('correct_response') or '' for item in chunk]
+        values = {
+            'prompt_ids': tokenizer(prompts, max_length=max_length, truncation=True)['input_ids'],
+            'target_ids': tokenizer(corrects, max_length=max_length, truncation=True)['input_ids'],
+            'prompt_text': [text.encode('utf-8') for text in prompts],
+            'correct_text': [text.encode('utf-8') for text in corrects],
+        }
+        for name, dtype in RAGGED_COLUMNS.items():
+            lengths = np.fromiter((len(row) for row in values[name]), dtype=np.int64, count=len(chunk))
+            if dtype is np.uint8:
+                flat = np.frombuffer(b''.join(values[name]), dtype=np.uint8)
+            else:
+                flat = np.fromiter((value for row in values[name] for value in row), dtype=dtype, count=int(lengths.sum()))
+            with open(os.path.join(path, f'{name}.bin'), 'ab') as f:
+                flat.tofile(f)
+            with open(os.path.join(path, f'{name}.offsets.bin'), 'ab') as f:
+                (ends[name] + np.cumsum(lengths)).tofile(f)
+            ends[name] += int(lengths.sum())
+        fixed = {
+            'reward': np.array([item.get('reward', 0) for item in chunk], dtype=np.float32),
+            'record_hash': np.array([record_hash(item) for item in chunk], dtype=np.uint64),
+        }
+        for name in FIXED_COLUMNS:
+            with open(os.path.join(path, f'{name}.bin'), 'ab') as f:
+                fixed[name].tofile(f)
+
+    meta['count'] = count + len(new_items)
+    tmp_path = meta_path + ".tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f, indent=4)
+    os.replace(tmp_path, meta_path)
+    return len(new_items)
+
+def main():
+    """Exports (or incrementally updates) the tokenized, memory-mapped copy of a feedback store."""
+    parser = argparse.ArgumentParser(description="Export the feedback store to a columnar, memory-mapped token store.")
+    parser.add_argument('--model-path', required=True, help="Checkpoint whose tokenizer is used.")
+    parser.add_argument('--feedback-file', default=FEEDBACK_FILE)
+    parser.add_argument('--output', default=TOKEN_STORE_DIR, help="Token store directory.")
+    parser.add_argument('--max-length', type=int, default=512)
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Rewrite the store from scratch (needed after regrading or changing the tokenizer).")
+    args = parser.parse_args()
+
+    from model_loader import load_tokenizer
+
+    appended = export_feedback(load_feedback(args.feedback_file), load_tokenizer(args.model_path),
+                               args.output, args.max_length, rebuild=args.rebuild)
+    print(f"Appended {appended} records; '{args.output}' now holds {len(TokenStore(args.output))}.")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,196 @@
+import argparse
+import json
+import os
+import random
+import time
+
+import torch
+import torch.distributed as dist
+import torch.multiprocessing as mp
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import DataLoader
+from torch.utils.data.distributed import DistributedSampler
+from transformers import T5Tokenizer, T5ForConditionalGeneration
+
+# Import from our custom modules
+from feedback_manager import load_feedback
+from feedback_strategies import STRATEGIES, BinaryFeedback
+from rl_agent import FeedbackDataset, TokenizedFeedbackDataset, make_optimizer
+from token_store import TokenStore, export_feedback, split_indices
+
+def split_feedback(feedback_data: list, val_fraction: float, seed: int) -> tuple:
+    """
+    De-duplicates the feedback history and splits it into training and validation items.
+    The split is seeded so repeated runs validate on the same items.
+    """
+    # The interactive loop can record the same item more than once; keep each record only once.
+    unique = {json.dumps(item, sort_keys=True): item for item in feedback_data}
+    items = list(unique.values())
+    random.Random(seed).shuffle(items)
+    num_val = int(len(items) * val_fraction)
+    return items[num_val:], items[:num_val]
+
+def add_feedback_arguments(parser):
+    """The options choosing the feedback history and which of its items are trained on."""
+    parser.add_argument('--feedback-mode', choices=sorted(STRATEGIES), default=BinaryFeedback.name,
+                        help="Feedback strategy whose history and reward threshold are used (see feedback_strategies.py).")
+    parser.add_argument('--feedback-file', default=None, help="Feedback history (default: the strategy's file).")
+    parser.add_argument('--min-reward', type=int, default=None,
+                        help="Lowest reward trained on (default: the strategy's threshold).")
+
+def resolve_feedback_arguments(args):
+    """Fills in the --feedback-file and --min-reward defaults of the chosen --feedback-mode."""
+    strategy = STRATEGIES[args.feedback_mode]()
+    if args.feedback_file is None:
+        args.feedback_file = strategy.feedback_file
+    if args.min_reward is None:
+        args.min_reward = strategy.min_reward
+
+def _all_reduce_sum(*values) -> list:
+    tensor = torch.tensor(values, dtype=torch.float64)
+    dist.all_reduce(tensor, op=dist.ReduceOp.SUM)
+    return tensor.tolist()
+
+def _validate(model, loader) -> float:
+    """Returns the mean validation loss across every process (0.0 without validation data)."""
+    model.eval()
+    total_loss, batches = 0.0, 0
+    with torch.no_grad():
+        for batch in loader:
+            total_loss += model(**batch).loss.item()
+            batches += 1
+    total_loss, batches = _all_reduce_sum(total_loss, batches)
+    model.train()
+    return total_loss / batches if batches else 0.0
+
+def build_datasets(args, tokenizer, train_items, val_items) -> tuple:
+    """Training and validation datasets: records from the feedback file, or row indices into the token store."""
+    if args.token_store:
+        store = TokenStore(args.token_store)
+        return tuple(
+            TokenizedFeedbackDataset(store, tokenizer.pad_token_id, args.max_length, args.min_reward, indices)
+            for indices in (train_items, val_items)
+        )
+    is_trainable = lambda item: item.get('reward', 0) >= args.min_reward
+    return (FeedbackDataset(train_items, tokenizer, args.max_length, is_trainable),
+            FeedbackDataset(val_items, tokenizer, args.max_length, is_trainable))
+
+def train_worker(rank: int, world_size: int, args, train_items: list, val_items: list):
+    """One data-parallel training process. Rank 0 reports progress and writes the checkpoint."""
+    os.environ.setdefault('MASTER_ADDR', '127.0.0.1')
+    os.environ.setdefault('MASTER_PORT', str(args.master_port))
+    dist.init_process_group('gloo', rank=rank, world_size=world_size)
+    torch.set_num_threads(args.threads_per_process)
+    torch.manual_seed(args.seed)
+
+    tokenizer = T5Tokenizer.from_pretrained(args.model_path)
+    base_model = T5ForConditionalGeneration.from_pretrained(args.model_path)
+    if args.low_memory:
+        # Non-reentrant checkpointing is the variant that works with DistributedDataParallel.
+        base_model.gradient_checkpointing_enable(gradient_checkpointing_kwargs={'use_reentrant': False})
+    model = DistributedDataParallel(base_model)
+    optimizer = make_optimizer(model.parameters(), args.lr, args.low_memory)
+
+    train_dataset, val_dataset = build_datasets(args, tokenizer, train_items, val_items)
+    if not len(train_dataset):
+        if rank == 0:
+            print("Training skipped: No feedback met the reward threshold for training.")
+        dist.destroy_process_group()
+        return
+
+    train_sampler = DistributedSampler(train_dataset, world_size, rank, shuffle=True, seed=args.seed)
+    loader_options = {
+        'batch_size': args.batch_size, 'num_workers': args.loader_workers,
+        'persistent_workers': args.loader_workers > 0,
+    }
+    train_loader = DataLoader(train_dataset, sampler=train_sampler, **loader_options)
+    val_loader = DataLoader(val_dataset, sampler=DistributedSampler(val_dataset, world_size, rank, shuffle=False),
+                            **loader_options) if len(val_dataset) else []
+
+    if rank == 0:
+        print(f"Training on {len(train_dataset)} examples ({len(val_dataset)} for validation) "
+              f"with {world_size} processes x {args.threads_per_process} threads.")
+
+    history = []
+    best_val_loss = float('inf')
+    model.train()
+    for epoch in range(1, args.epochs + 1):
+        train_sampler.set_epoch(epoch)
+        start_time = time.perf_counter()
+        total_loss, batches = 0.0, 0
+        for batch in train_loader:
+            optimizer.zero_grad()
+            loss = model(**batch).loss
+            loss.backward()
+            optimizer.step()
+            total_loss += loss.item()
+            batches += 1
+
+        total_loss, batches = _all_reduce_sum(total_loss, batches)
+        train_loss = total_loss / batches if batches else 0.0
+        val_loss = _validate(model, val_loader)
+        history.append({'epoch': epoch, 'train_loss': train_loss, 'val_loss': val_loss})
+
+        if rank == 0:
+            print(f"Epoch {epoch}/{args.epochs}: train loss {train_loss:.4f}, "
+                  f"validation loss {val_loss:.4f} ({time.perf_counter() - start_time:.1f}s)")
+            # Keep the checkpoint with the best validation loss (or the last one without validation data).
+            if not val_loader or val_loss < best_val_loss:
+                best_val_loss = val_loss
+                model.module.save_pretrained(args.output_dir, safe_serialization=True)
+                tokenizer.save_pretrained(args.output_dir)
+                print(f"Saved checkpoint to '{args.output_dir}'.")
+
+    if rank == 0:
+        with open(os.path.join(args.output_dir, 'training_history.json'), 'w') as f:
+            json.dump({'args': vars(args), 'history': history}, f, indent=4)
+    dist.destroy_process_group()
+
+def main():
+    """Fine-tunes the hint model on the whole feedback store, outside the interactive loop."""
+    parser = argparse.ArgumentParser(description="Offline data-parallel training over the feedback store.")
+    parser.add_argument('--model-path', required=True, help="Checkpoint to start from (e.g. main.py's MODEL_PATH).")
+    parser.add_argument('--output-dir', required=True, help="Where the trained checkpoint is written.")
+    add_feedback_arguments(parser)
+    parser.add_argument('--epochs', type=int, default=3)
+    parser.add_argument('--batch-size', type=int, default=8, help="Per-process batch size.")
+    parser.add_argument('--lr', type=float, default=5e-5)
+    parser.add_argument('--max-length', type=int, default=512)
+    parser.add_argument('--low-memory', action='store_true',
+                        help="Train with Adafactor and gradient checkpointing to fit larger models.")
+    parser.add_argument('--val-fraction', type=float, default=0.1)
+    parser.add_argument('--processes', type=int, default=max(1, (os.cpu_count() or 1) // 4),
+                        help="Data-parallel training processes (torch.distributed, gloo backend).")
+    parser.add_argument('--threads-per-process', type=int, default=4, help="torch intra-op threads per process.")
+    parser.add_argument('--loader-workers', type=int, default=1, help="DataLoader workers per process.")
+    parser.add_argument('--token-store', default=None,
+                        help="Train from this token store (see token_store.py), updated from --feedback-file first.")
+    parser.add_argument('--no-export', action='store_true',
+                        help="With --token-store, train on the store as it is without reading the feedback file.")
+    parser.add_argument('--master-port', type=int, default=29500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    resolve_feedback_arguments(args)
+
+    if args.token_store:
+        if not args.no_export:
+            try:
+                appended = export_feedback(load_feedback(args.feedback_file), T5Tokenizer.from_pretrained(args.model_path),
+                                           args.token_store, args.max_length)
+            except ValueError as e:
+                print(e)
+                return
+            print(f"Appended {appended} new records to the token store '{args.token_store}'.")
+        # Only row indices are handed to the training processes; each maps the store itself.
+        train_items, val_items = split_indices(TokenStore(args.token_store), args.val_fraction, args.seed)
+    else:
+        train_items, val_items = split_feedback(load_feedback(args.feedback_file), args.val_fraction, args.seed)
+    if not len(train_items):
+        print(f"No feedback found in '{args.feedback_file}'. Nothing to train on.")
+        return
+    os.makedirs(args.output_dir, exist_ok=True)
+    mp.spawn(train_worker, args=(args.processes, args, train_items, val_items), nprocs=args.processes, join=True)
+    print(f"\nTraining finished. Point MODEL_PATH in main.py at '{args.output_dir}' to use the new model.")
+
+if __name__ == "__main__":
+    main()
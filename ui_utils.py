@@ -40,7 +40,8 @@ def get_basic_info(component: dict) -> dict:
         'text': component.get('@text'),
         'label': component.get('@content-desc'), # 'label' is often in content-desc
         'text-hint': component.get('@content-desc'), # Also check here for hints
-        'app_name': component.get('@package')
+        'app_name': component.get('@package'),
+        'bounds': component.get('@bounds')
     }
 
 def parse_bounds(bounds_str: str) -> list: